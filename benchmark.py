@@ -0,0 +1,364 @@
+"""
+Benchmarks the scanners, the parser and the VM engines on synthetic programs, and compares the results with a
+stored baseline.
+> python3 benchmark.py -o results.json
+> python3 benchmark.py --baseline results.json
+> python3 benchmark.py --generate program.txt --size 100000 --error-rate 0.01
+Programs for the scanners and the parser are random derivations of resource/grammar.txt; the VM runs a fixed
+workload compiled by the compiler, since random programs seldom terminate.
+"""
+import argparse
+import functools
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import scanner
+import test_vm
+from codegen import format_code
+from grammar import GRAMMAR_PATH, is_action, read_grammar
+from session import CompilationSession
+
+# bump when a change to the programs or the measurements makes results incomparable with older ones
+BENCHMARK_VERSION = 1
+SCANNERS = ['Scanner', 'TableScanner', 'StreamScanner']
+# results are comparable when these parameters match
+WORKLOAD_PARAMETERS = ['seed', 'size', 'depth', 'error_rate', 'vm_iterations']
+ERROR_KINDS = ['invalid input', 'invalid number', 'unmatched comment', 'missing token', 'extra token']
+INVALID_CHARACTERS = '$@!~'
+# statements between line breaks are indented by this much per open brace
+INDENT = '    '
+FIB_ARGUMENT = 12
+VM_WORKLOAD = '''int table[64];
+
+int fib(int n) {{
+    if (n < 2) return n;
+    else return fib(n - 1) + fib(n - 2);
+    endif
+}}
+
+int mix(int a[], int i, int s) {{
+    a[i - i / 64 * 64] = s;
+    return s + i * 3 - a[i / 2 - i / 128 * 64];
+}}
+
+void main(void) {{
+    int i;
+    int s;
+    i = 0;
+    s = 0;
+    while (i < {iterations}) {{
+        s = mix(table, i, s);
+        if (1000000 < s) s = s - 1000000; endif
+        i = i + 1;
+    }}
+    output(s);
+    output(fib({fib}));
+}}
+'''
+
+
+class ProgramGenerator:
+    """
+    Seeded generator of random programs derived from the grammar. The program level list grows until the program
+    has about size tokens; below it a rule with a nonterminal is picked growth times as often as the empty rule,
+    and a list continues past its first item with even odds. A nonterminal max_depth deep in the derivation tree,
+    and every nonterminal once the size is reached, takes one of its shortest rules. error_rate is the share of
+    tokens turned into a lexical or syntax error.
+    """
+
+    def __init__(self, seed=0, size=1000, max_depth=18, error_rate=0.0, names=64, growth=2, path=GRAMMAR_PATH):
+        self.rng = random.Random(seed)
+        self.size = size
+        self.max_depth = max_depth
+        self.error_rate = error_rate
+        self.names = names
+        self.growth = growth
+        rules = [(left, [symbol for symbol in right if not is_action(symbol)]) for left, right in read_grammar(path)]
+        self.start = rules[0][0]
+        self.rules = {}
+        for left, right in rules:
+            self.rules.setdefault(left, []).append(right)
+        self.terminals = sorted({symbol for _, right in rules for symbol in right if symbol not in self.rules})
+        heights = self.heights()
+        self.shortest = {nonterminal: [right for right in rights if self.height(right, heights) == heights[nonterminal]]
+                         for nonterminal, rights in self.rules.items()}
+        self.program_level = {symbol for symbol in rules[0][1] if symbol in self.rules}
+
+    def height(self, right, heights):
+        return 1 + max((heights[symbol] for symbol in right if symbol in self.rules), default=0)
+
+    def heights(self):
+        """The height of the lowest derivation tree of each nonterminal."""
+        heights = dict.fromkeys(self.rules, math.inf)
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, rights in self.rules.items():
+                for right in rights:
+                    height = self.height(right, heights)
+                    if height < heights[nonterminal]:
+                        heights[nonterminal] = height
+                        changed = True
+        return heights
+
+    def choose(self, nonterminal, depth, tail, exhausted):
+        if exhausted or depth >= self.max_depth:
+            return self.rng.choice(self.shortest[nonterminal])
+        rights = self.rules[nonterminal]
+        if nonterminal in self.program_level and depth == 1:
+            return self.rng.choice([right for right in rights if right] or rights)
+        growth = 1 if tail else self.growth
+        return self.rng.choices(rights, [growth if right else 1 for right in rights])[0]
+
+    def derive(self):
+        """
+        Yields the terminals of a random derivation of the start symbol, expanding with an explicit stack. The
+        depth of a nonterminal is its depth in the derivation tree, where a list continuing in the last symbol of
+        its own rule counts as the list itself.
+        """
+        rng = self.rng
+        count = 0
+        stack = [(self.start, 0, False)]
+        while stack:
+            symbol, depth, tail = stack.pop()
+            if symbol not in self.rules:
+                count += 1
+                if symbol == 'ID':
+                    yield f'v{rng.randrange(self.names)}'
+                elif symbol == 'NUM':
+                    yield str(rng.randrange(1000))
+                else:
+                    yield symbol
+                continue
+            right = self.choose(symbol, depth, tail, count >= self.size)
+            last = len(right) - 1
+            for i in range(last, -1, -1):
+                if i == last and right[i] == symbol:
+                    stack.append((symbol, depth, True))
+                else:
+                    stack.append((right[i], depth + 1, False))
+
+    def corrupt(self, lexeme):
+        """Returns the lexemes replacing lexeme to inject a random error."""
+        kind = self.rng.choice(ERROR_KINDS)
+        if kind == 'invalid input':
+            return [lexeme + self.rng.choice(INVALID_CHARACTERS)]
+        if kind == 'invalid number':
+            return [f'{self.rng.randrange(1000)}{self.rng.choice("abc")}']
+        if kind == 'unmatched comment':
+            return [lexeme, '*/']
+        if kind == 'missing token':
+            return []
+        extra = self.rng.choice(self.terminals)
+        if extra == 'ID':
+            extra = f'v{self.rng.randrange(self.names)}'
+        elif extra == 'NUM':
+            extra = str(self.rng.randrange(1000))
+        return [lexeme, extra]
+
+    def generate(self):
+        lines = []
+        line = []
+        depth = 0
+        for lexeme in self.derive():
+            lexemes = [lexeme]
+            if self.error_rate and self.rng.random() < self.error_rate:
+                lexemes = self.corrupt(lexeme)
+            for text in lexemes:
+                if text == '}':
+                    depth = max(depth - 1, 0)
+                line.append(text)
+                if text in (';', '{', '}', 'endif'):
+                    lines.append(INDENT * depth + ' '.join(line))
+                    line = []
+                if text == '{':
+                    depth += 1
+        if line:
+            lines.append(INDENT * depth + ' '.join(line))
+        return '\n'.join(lines) + '\n'
+
+
+def vm_workload(iterations):
+    return VM_WORKLOAD.format(iterations=iterations, fib=FIB_ARGUMENT)
+
+
+class CountingTracer(test_vm.Tracer):
+    def __init__(self):
+        self.executed = 0
+
+    def instruction(self, pc, record):
+        self.executed += 1
+
+
+def measure(run, repeat=3):
+    """
+    Times run, a function returning the number of items it processed, keeping the fastest of repeat runs, then
+    runs it once more under tracemalloc for its peak memory.
+    """
+    seconds = math.inf
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        items = run()
+        seconds = min(seconds, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'items': items, 'seconds': seconds, 'rate': items / seconds if seconds else 0.0, 'peak_bytes': peak}
+
+
+# each bench_ function does the untimed setup and returns the function measure() times
+
+def bench_scanner(path, scanner_class):
+    def run():
+        session = CompilationSession(path, scanner_class)
+        session.scan()
+        return len(session.tokens)
+    return run
+
+
+def bench_parser(path):
+    session = CompilationSession(path)
+    session.scan()
+
+    def run():
+        session.syntax_errors.clear()
+        return len(session.parse())
+    return run
+
+
+def bench_vm(lines, engine):
+    def run():
+        output = test_vm.NullFile()
+        if engine == 'decoded':
+            test_vm.run_decoded(lines, output, test_vm.NULL_FILE, None)
+        else:
+            test_vm.ENGINES[engine](lines, output, test_vm.NULL_FILE)
+        return executed
+    tracer = CountingTracer()
+    test_vm.run_decoded(lines, test_vm.NullFile(), test_vm.NULL_FILE, tracer)
+    executed = tracer.executed
+    return run
+
+
+def run_benchmarks(parameters, only=None):
+    """Returns the results of the benchmarks whose name starts with one of the prefixes in only, or all of them."""
+    benchmarks = {}
+    with tempfile.TemporaryDirectory() as directory:
+        programs = {}
+        for name, error_rate in (('valid', 0.0), ('errors', parameters['error_rate'])):
+            programs[name] = os.path.join(directory, f'{name}.txt')
+            generator = ProgramGenerator(parameters['seed'], parameters['size'], parameters['depth'], error_rate)
+            with open(programs[name], 'w') as f:
+                f.write(generator.generate())
+        for name in SCANNERS:
+            benchmarks[f'scanner.{name}'] = ('tokens/s', functools.partial(bench_scanner, programs['valid'],
+                                                                           getattr(scanner, name)))
+        for name, path in programs.items():
+            benchmarks[f'parser.{name}'] = ('nodes/s', functools.partial(bench_parser, path))
+        vm_path = os.path.join(directory, 'workload.txt')
+        with open(vm_path, 'w') as f:
+            f.write(vm_workload(parameters['vm_iterations']))
+        lines = format_code(CompilationSession(vm_path).compile(False).code)
+        for engine in parameters['engines']:
+            benchmarks[f'vm.{engine}'] = ('instructions/s', functools.partial(bench_vm, lines, engine))
+
+        results = {}
+        for name, (unit, setup) in benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = dict(measure(setup(), parameters['repeat']), unit=unit)
+            print(f'{name:<24} {format_rate(results[name])}', file=sys.stderr)
+    return results
+
+
+def format_rate(result):
+    return (f'{result["rate"]:>14,.0f} {result["unit"]:<15} {result["seconds"] * 1000:10.1f} ms '
+            f'{result["peak_bytes"] / (1 << 20):9.1f} MiB peak')
+
+
+def compare(results, baseline, tolerance):
+    """Returns a message per benchmark that got slower, or needs more memory, than the baseline by over tolerance."""
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        old = baseline['benchmarks'].get(name)
+        if old is None:
+            continue
+        if result['rate'] < old['rate'] * (1 - tolerance):
+            regressions.append(f'{name}: {result["rate"]:,.0f} {result["unit"]}, '
+                               f'{100 * (result["rate"] / old["rate"] - 1):+.1f}% from {old["rate"]:,.0f}')
+        if result['peak_bytes'] > old['peak_bytes'] * (1 + tolerance):
+            regressions.append(f'{name}: {result["peak_bytes"]:,} bytes peak, '
+                               f'{100 * (result["peak_bytes"] / old["peak_bytes"] - 1):+.1f}% from '
+                               f'{old["peak_bytes"]:,}')
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmarks the scanners, the parser and the VM.')
+    arg_parser.add_argument('--seed', type=int, default=0, help='seed of the generated programs')
+    arg_parser.add_argument('--size', type=int, default=20000, help='tokens of the generated programs')
+    arg_parser.add_argument('--depth', type=int, default=18,
+                            help='depth of the derivation trees of the generated programs, lists not counted')
+    arg_parser.add_argument('--error-rate', type=float, default=0.01,
+                            help='share of erroneous tokens in the program of the parser.errors benchmark')
+    arg_parser.add_argument('--vm-iterations', type=int, default=2000, help='loop iterations of the VM workload')
+    arg_parser.add_argument('--engines', default='decoded,compiled,reference',
+                            help='comma separated VM engines to benchmark')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark, the fastest counts')
+    arg_parser.add_argument('--only', help='comma separated benchmark name prefixes to run, e.g. scanner,vm.compiled')
+    arg_parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    arg_parser.add_argument('--baseline', help='JSON results to compare with; exits with 1 on a regression')
+    arg_parser.add_argument('--tolerance', type=float, default=0.1,
+                            help='relative slowdown or memory growth over the baseline that counts as a regression')
+    arg_parser.add_argument('--generate', metavar='PATH',
+                            help='only write a program generated with --seed, --size, --depth and --error-rate to PATH')
+    args = arg_parser.parse_args(argv)
+
+    if args.generate:
+        with open(args.generate, 'w') as f:
+            f.write(ProgramGenerator(args.seed, args.size, args.depth, args.error_rate).generate())
+        return 0
+    parameters = {'seed': args.seed, 'size': args.size, 'depth': args.depth, 'error_rate': args.error_rate,
+                  'vm_iterations': args.vm_iterations,
+                  'engines': args.engines.split(','), 'repeat': args.repeat}
+    unknown = [engine for engine in parameters['engines'] if engine not in test_vm.ENGINES]
+    if unknown:
+        arg_parser.error(f'unknown engines: {", ".join(unknown)}')
+    results = {
+        'version': BENCHMARK_VERSION,
+        'python': platform.python_version(),
+        'parameters': parameters,
+        'benchmarks': run_benchmarks(parameters, args.only.split(',') if args.only else None),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline.get('version') != BENCHMARK_VERSION
+            or any(baseline['parameters'].get(name) != parameters[name] for name in WORKLOAD_PARAMETERS)):
+        print('The baseline was measured on other programs or with another benchmark version.', file=sys.stderr)
+        return 1
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+from grammar import load_tables
+from optimizer import PASSES
+from parser import DEFAULT_ERROR_LIMITS
+
+# bump when a change to the scanner, parser, code generator or optimizer changes their output
+CACHE_VERSION = 6
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = '.zlib'
+
+
+class CompileCache:
+    """
+    On-disk cache of compiler outputs, keyed by the hash of the input contents, the grammar tables and
+    CACHE_VERSION. Each entry is one zlib-compressed JSON file; hits refresh its mtime, and evict() drops the
+    least recently used entries once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = f'{CACHE_VERSION}:{load_tables().GRAMMAR_HASH}'.encode()
+
+    def key(self, input_path, build_tree=True, passes=PASSES, error_limits=DEFAULT_ERROR_LIMITS):
+        digest = hashlib.sha256(self.version + (b':tree' if build_tree else b':no-tree')
+                                + f':{",".join(passes)}:{error_limits.per_file}:{error_limits.per_line}:'.encode())
+        with open(input_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def load(self, key):
+        """Returns the stored entry, a dict with the written output files' contents under 'files', or None."""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except (OSError, ValueError, zlib.error):
+            return None
+        return entry
+
+    def store(self, key, entry):
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written to a temporary file and renamed, so concurrent workers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(zlib.compress(json.dumps(entry).encode()))
+        os.replace(temp_path, path)
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in max_bytes; returns the bytes freed."""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            freed += size
+        return freed
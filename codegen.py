@@ -0,0 +1,415 @@
+"""
+Single-pass semantic analysis and intermediate code generation. The parser calls CodeGenerator through the
+action symbols of resource/grammar.txt; the generator checks the program with a semantic stack and emits
+three-address code for test_vm.py as it goes, so nothing but the stack and the code grows with the input.
+
+Every variable, parameter and temporary has a static address. A function's cells are allocated contiguously,
+starting with its return address and return value cells. A temporary lives until the routine that consumes its
+operand runs, and its cell then goes back to the function's pool for later expressions to reuse, so a function
+needs only as many temporary cells as are live at once. A recursive call pushes the caller's live cells on a
+runtime stack above the data and pops them back after the call returns.
+"""
+from collections import namedtuple
+
+from parser import ParseListener
+from symbols import Symbol, SymbolKind
+
+WORD_SIZE = 4
+DATA_START = 100
+OPERATIONS = {'+': 'ADD', '-': 'SUB', '*': 'MULT', '/': 'DIV', '<': 'LT', '==': 'EQ'}
+
+# text is the instruction operand holding the value; function is set for function names
+Operand = namedtuple('Operand', 'text type function', defaults=[None])
+UNDEFINED = Operand('#0', None)
+VOID = Operand('#0', 'void')
+
+
+class Variable(Symbol):
+    def operand(self):
+        if self.kind == SymbolKind.ARRAY:
+            # arrays evaluate to their base address, which array parameters hold as their value
+            return Operand(f'#{self.address}', 'array')
+        return Operand(str(self.address), self.type)
+
+
+class Function(Symbol):
+    def __init__(self, name, type, params=None):
+        super().__init__(name, SymbolKind.FUNCTION, type)
+        self.params = params or []
+        self.entry = None
+        self.return_address = None
+        self.return_value = None
+        self.frame_start = None
+        self.cells = 0
+        # temporary cells allocated, the most live at once, and those free for reuse
+        self.temporaries = 0
+        self.free = []
+        # the most cells a recursive call saved
+        self.saved = 0
+
+    @property
+    def arity(self):
+        return len(self.params)
+
+    def operand(self):
+        return Operand('#0', self.type, self)
+
+
+class CodeGenerator(ParseListener):
+    """
+    Runs the semantic routine of each action symbol. Declarations go into session.symbol_table, semantic errors
+    are collected in session.semantic_errors and the code in self.code as (operation, operand, operand, operand)
+    tuples. After a syntax error the actions no longer match the program, so the generator stops.
+    """
+
+    def __init__(self, session):
+        self.semantic_errors = session.semantic_errors
+        self.code = []
+        # what optimizer.Program needs to know about the code
+        self.temporaries = set()
+        self.return_sites = []
+        self.functions = []
+        self.stack = []
+        self.symbols = session.symbol_table
+        self.loops = []
+        self.arguments = []
+        self.function = None
+        self.next_address = DATA_START
+        self.line_number = 0
+        self.lexeme = None
+        self.stopped = False
+        # routines named after a Python keyword end in an underscore
+        self.routines = {'#' + name.rstrip('_'): getattr(self, name) for name in ROUTINES}
+        self.stack_pointer = self.allocate()
+        self.pointer = self.allocate()
+        self.flag = self.allocate()
+        self.symbols.enter_scope()
+        self.symbols.declare(Function('output', 'void', [Variable('a', SymbolKind.PARAMETER, 'int')]))
+        # jumps to the initialization emitted by end_program
+        self.reserve()
+
+    def action(self, name, line_number, lexeme):
+        if self.stopped:
+            return
+        self.line_number = line_number
+        self.lexeme = lexeme
+        self.routines[name]()
+
+    def error(self, line_number, message):
+        self.stopped = True
+
+    def semantic_error(self, message):
+        self.semantic_errors[self.line_number].append(message)
+
+    def emit(self, operation, *operands):
+        self.code.append((operation, *operands))
+
+    def reserve(self):
+        self.code.append(None)
+        return len(self.code) - 1
+
+    def allocate(self, cells=1):
+        address = self.next_address
+        self.next_address += cells * WORD_SIZE
+        if self.function is not None:
+            self.function.cells += cells
+        return address
+
+    def temporary(self):
+        function = self.function
+        if function is not None and function.free:
+            return function.free.pop()
+        address = str(self.allocate())
+        self.temporaries.add(address)
+        if function is not None:
+            function.temporaries += 1
+        return address
+
+    def release(self, *texts):
+        """Returns the temporaries that operands hold or point through to the current function's pool."""
+        for text in texts:
+            address = text.lstrip('@')
+            if address in self.temporaries and self.function is not None:
+                self.function.free.append(address)
+
+    def live_cells(self, function):
+        """
+        The cells of function a recursive call has to save: all but its return value cell, which is only written
+        right before returning, and its free temporaries.
+        """
+        free = set(function.free)
+        return [str(address) for address in range(function.frame_start, self.next_address, WORD_SIZE)
+                if address != function.return_value and str(address) not in free]
+
+    def push_frame(self, cells):
+        for cell in cells:
+            self.emit('ASSIGN', cell, f'@{self.stack_pointer}')
+            self.emit('ADD', str(self.stack_pointer), f'#{WORD_SIZE}', str(self.stack_pointer))
+
+    def pop_frame(self, cells):
+        for cell in reversed(cells):
+            self.emit('SUB', str(self.stack_pointer), f'#{WORD_SIZE}', str(self.stack_pointer))
+            self.emit('ASSIGN', f'@{self.stack_pointer}', cell)
+
+    # declarations
+
+    def ptype(self):
+        self.stack.append(self.lexeme)
+
+    def pname(self):
+        self.stack.append(self.lexeme)
+
+    def pnum(self):
+        self.stack.append(Operand(f'#{self.lexeme}', 'int'))
+
+    def declare_variable(self, kind, type, cells=1):
+        name = self.stack.pop()
+        if self.stack.pop() == 'void':
+            self.semantic_error(f"Illegal type of void for '{name}'.")
+        return self.symbols.declare(Variable(name, kind, type, self.allocate(cells)))
+
+    def declare_var(self):
+        self.declare_variable(SymbolKind.VARIABLE, 'int')
+
+    def declare_array(self):
+        size = int(self.stack.pop().text[1:])
+        self.declare_variable(SymbolKind.ARRAY, 'array', size)
+
+    def declare_param(self):
+        self.function.params.append(self.declare_variable(SymbolKind.PARAMETER, 'int'))
+
+    def declare_array_param(self):
+        self.function.params.append(self.declare_variable(SymbolKind.ARRAY_PARAMETER, 'array'))
+
+    def declare_function(self):
+        name = self.stack.pop()
+        function = self.symbols.declare(Function(name, self.stack.pop()))
+        self.functions.append(function)
+        if self.function is not None:
+            # C-minus has no nested functions, but the grammar does; the enclosing function jumps over them
+            self.stack.append(self.reserve())
+        self.stack.append(self.function)
+        function.entry = len(self.code)
+        function.frame_start = self.next_address
+        self.function = function
+        function.return_address = self.allocate()
+        function.return_value = self.allocate()
+        self.symbols.enter_scope()
+
+    def end_function(self):
+        self.emit('JP', f'@{self.function.return_address}')
+        self.symbols.exit_scope()
+        self.function = self.stack.pop()
+        if self.function is not None:
+            self.code[self.stack.pop()] = ('JP', str(len(self.code)))
+
+    def begin_scope(self):
+        self.symbols.enter_scope()
+
+    def end_scope(self):
+        self.symbols.exit_scope()
+
+    def end_program(self):
+        self.code[0] = ('JP', str(len(self.code)))
+        stack_start = self.next_address
+        first = self.flag + WORD_SIZE
+        if first < stack_start:
+            # zero the data, so globals start at 0 and saving a frame never reads an unset cell
+            self.emit('ASSIGN', f'#{first}', str(self.pointer))
+            self.emit('ASSIGN', '#0', f'@{self.pointer}')
+            self.emit('ADD', str(self.pointer), f'#{WORD_SIZE}', str(self.pointer))
+            self.emit('EQ', str(self.pointer), f'#{stack_start}', str(self.flag))
+            self.emit('JPF', str(self.flag), str(len(self.code) - 3))
+        self.emit('ASSIGN', f'#{stack_start}', str(self.stack_pointer))
+        main = self.symbols.lookup('main')
+        if isinstance(main, Function) and main.entry is not None:
+            self.return_sites.append(len(self.code))
+            self.emit('ASSIGN', f'#{len(self.code) + 2}', str(main.return_address))
+            self.emit('JP', str(main.entry))
+
+    # statements
+
+    def pop(self):
+        self.release(self.stack.pop().text)
+
+    def save(self):
+        # the jump filled into the slot is the last to read the condition below it
+        self.release(self.stack[-1].text)
+        self.stack.append(self.reserve())
+
+    def jpf(self):
+        slot = self.stack.pop()
+        self.code[slot] = ('JPF', self.stack.pop().text, str(len(self.code)))
+
+    def jpf_save(self):
+        slot = self.stack.pop()
+        self.code[slot] = ('JPF', self.stack.pop().text, str(len(self.code) + 1))
+        self.stack.append(self.reserve())
+
+    def jp(self):
+        self.code[self.stack.pop()] = ('JP', str(len(self.code)))
+
+    def label(self):
+        self.stack.append(len(self.code))
+        self.loops.append([])
+
+    def while_(self):
+        slot = self.stack.pop()
+        condition = self.stack.pop()
+        self.emit('JP', str(self.stack.pop()))
+        self.code[slot] = ('JPF', condition.text, str(len(self.code)))
+        for slot in self.loops.pop():
+            self.code[slot] = ('JP', str(len(self.code)))
+
+    def break_(self):
+        if not self.loops:
+            self.semantic_error("No 'while' found for 'break'.")
+            return
+        self.loops[-1].append(self.reserve())
+
+    def return_(self):
+        self.emit('JP', f'@{self.function.return_address}')
+
+    def return_value(self):
+        value = self.stack.pop()
+        self.release(value.text)
+        self.emit('ASSIGN', value.text, str(self.function.return_value))
+        self.return_()
+
+    # expressions
+
+    def pid(self):
+        name = self.lexeme
+        symbol = self.symbols.lookup(name)
+        if symbol is None:
+            self.semantic_error(f"'{name}' is not defined.")
+            self.stack.append(UNDEFINED)
+        else:
+            self.stack.append(symbol.operand())
+
+    def push_op(self):
+        self.stack.append(self.lexeme)
+
+    def assign(self):
+        value = self.stack.pop()
+        self.release(value.text)
+        self.emit('ASSIGN', value.text, self.stack[-1].text)
+
+    def index(self):
+        index = self.stack.pop()
+        array = self.stack.pop()
+        if index.text.startswith('#') and array.text.startswith('#'):
+            self.stack.append(Operand(str(int(array.text[1:]) + WORD_SIZE * int(index.text[1:])), 'int'))
+            return
+        self.release(index.text)
+        offset = self.temporary()
+        self.emit('MULT', index.text, f'#{WORD_SIZE}', offset)
+        self.release(offset)
+        address = self.temporary()
+        self.emit('ADD', array.text, offset, address)
+        self.stack.append(Operand(f'@{address}', 'int'))
+
+    def binary(self):
+        right = self.stack.pop()
+        operator = self.stack.pop()
+        left = self.stack.pop()
+        if left.type is not None and right.type is not None and left.type != right.type:
+            self.semantic_error(f'Type mismatch in operands, Got {right.type} instead of {left.type}.')
+        self.release(left.text, right.text)
+        result = self.temporary()
+        self.emit(OPERATIONS[operator], left.text, right.text, result)
+        self.stack.append(Operand(result, 'int'))
+
+    def negate(self):
+        value = self.stack.pop()
+        if value.text.startswith('#'):
+            self.stack.append(Operand(f'#{-int(value.text[1:])}', value.type))
+            return
+        self.release(value.text)
+        result = self.temporary()
+        self.emit('SUB', '#0', value.text, result)
+        self.stack.append(Operand(result, value.type))
+
+    def begin_args(self):
+        self.arguments.append(len(self.stack))
+
+    def call(self):
+        start = self.arguments.pop()
+        args = self.stack[start:]
+        del self.stack[start:]
+        self.release(*(arg.text for arg in args))
+        function = self.stack.pop().function
+        if function is None:
+            # an undefined name, already reported, or a variable
+            self.stack.append(UNDEFINED)
+            return
+        if len(args) != function.arity:
+            self.semantic_error(f"Mismatch in numbers of arguments of '{function.name}'.")
+        else:
+            for number, (param, arg) in enumerate(zip(function.params, args), 1):
+                if arg.type is not None and arg.type != param.type:
+                    self.semantic_error(f"Mismatch in type of argument {number} of '{function.name}'. "
+                                        f"Expected '{param.type}' but got '{arg.type}' instead.")
+                    break
+        if function.entry is None:
+            # output
+            if args:
+                self.emit('PRINT', args[0].text)
+            self.stack.append(VOID)
+            return
+        recursive = function is self.function
+        if recursive:
+            # the arguments are released already, they are read before the call but not after it
+            saved = self.live_cells(function)
+            function.saved = max(function.saved, len(saved))
+            self.push_frame(saved)
+        for param, arg in zip(function.params, args):
+            self.emit('ASSIGN', arg.text, str(param.address))
+        self.return_sites.append(len(self.code))
+        self.emit('ASSIGN', f'#{len(self.code) + 2}', str(function.return_address))
+        self.emit('JP', str(function.entry))
+        result = VOID
+        if function.type != 'void':
+            result = Operand(self.temporary(), 'int')
+            self.emit('ASSIGN', str(function.return_value), result.text)
+        if recursive:
+            self.pop_frame(saved)
+        self.stack.append(result)
+
+    def frame_report(self):
+        """The cells, most live temporaries and largest saved recursive frame of each function, in source order."""
+        return [{'function': function.name, 'cells': function.cells, 'temporaries': function.temporaries,
+                 'saved': function.saved} for function in self.functions]
+
+
+ROUTINES = ['ptype', 'pname', 'pnum', 'declare_var', 'declare_array', 'declare_param', 'declare_array_param',
+            'declare_function', 'end_function', 'begin_scope', 'end_scope', 'end_program', 'pop', 'save', 'jpf',
+            'jpf_save', 'jp', 'label', 'break_', 'while_', 'return_', 'return_value', 'pid', 'push_op', 'assign',
+            'index', 'binary', 'negate', 'begin_args', 'call']
+
+
+def format_code(code):
+    """The lines of output.txt for code, as test_vm.py reads them."""
+    return [f'{i}\t({", ".join(instruction)}{", " * (4 - len(instruction))})\n' for i, instruction in enumerate(code)]
+
+
+def save_code(code, path='output.txt'):
+    with open(path, 'w') as f:
+        if code is None:
+            f.write('The output code has not been generated.')
+        else:
+            f.write(''.join(format_code(code)))
+
+
+def format_frames(frames, indent=''):
+    return '\n'.join(f"{indent}{frame['function']}: {frame['cells']} cells, at most {frame['temporaries']} live "
+                     f"temporaries" + (f", {frame['saved']} cells saved per recursive call" if frame['saved'] else '')
+                     for frame in frames)
+
+
+def save_semantic_errors(semantic_errors, path='semantic_errors.txt'):
+    lines = [f'#{line_no} : Semantic Error! {error}\n'
+             for line_no, errors in sorted(semantic_errors.items())
+             for error in errors]
+    with open(path, 'w') as f:
+        f.write(''.join(lines) or 'The input program is semantically correct.\n')
@@ -1,10 +1,221 @@
 # Kasra Hajian    99109411
-from scanner import *
-from parser import *
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import DEFAULT_MAX_BYTES, CompileCache
+from codegen import format_frames
+from optimizer import PASSES, format_report
+from parser import DEFAULT_ERROR_LIMITS, ErrorLimits, init_first_follow
+from scanner import ParallelScanner, TableScanner
+from session import CompilationSession
+from stats import Stats, merge_reports, profiled
+
+CompileResult = namedtuple('CompileResult',
+                           'input_path seconds lexical_errors syntax_errors semantic_errors optimization frames '
+                           'cache_hit failure stats')
+PROFILE_FILE = 'compile.prof'
+
+
+def collect_inputs(sources, pattern, files_from=None):
+    """Expands directories (with pattern), globs and plain paths into a sorted list of input files."""
+    paths = []
+    if files_from:
+        with open(files_from) as f:
+            sources = list(sources) + [line.strip() for line in f if line.strip()]
+    for source in sources:
+        if os.path.isdir(source):
+            paths += glob.glob(os.path.join(source, pattern), recursive=True)
+        elif glob.has_magic(source):
+            paths += glob.glob(source, recursive=True)
+        else:
+            paths.append(source)
+    return sorted(set(os.path.abspath(path) for path in paths if os.path.isfile(path)))
+
+
+def get_output_dirs(paths, output_root):
+    """Maps each input to its own output directory, mirroring the inputs' layout below their common parent."""
+    if not paths:
+        return []
+    base = os.path.commonpath([os.path.dirname(path) for path in paths])
+    return [os.path.join(output_root, os.path.splitext(os.path.relpath(path, base))[0]) for path in paths]
+
+
+def compile_to(input_path, output_dir, cache=None, build_tree=True, passes=PASSES, error_limits=DEFAULT_ERROR_LIMITS,
+               scanner_class=TableScanner, stats=None, profile=False):
+    """
+    Compiles input_path and writes its outputs into output_dir. On a cache hit the stored outputs are written
+    without running the scanner and parser. The phases are recorded in stats, and with profile the whole
+    compilation runs under cProfile, whose stats go to PROFILE_FILE in output_dir.
+    Returns (lexical error count, syntax error count, semantic error count, optimization report, frame report,
+    cache hit); the reports are None when no code was generated.
+    """
+    stats = stats or Stats()
+    if profile:
+        with profiled(os.path.join(output_dir, PROFILE_FILE)):
+            return compile_to(input_path, output_dir, cache, build_tree, passes, error_limits, scanner_class, stats)
+    key = cache.key(input_path, build_tree, passes, error_limits) if cache else None
+    entry = cache.load(key) if cache else None
+    if entry is not None:
+        with stats.phase('cache'):
+            for name, content in entry['files'].items():
+                with open(os.path.join(output_dir, name), 'w', newline='') as f:
+                    f.write(content)
+        stats.count('output_bytes', sum(len(content.encode()) for content in entry['files'].values()))
+        return (entry['lexical_errors'], entry['syntax_errors'], entry['semantic_errors'], entry['optimization'],
+                entry['frames'], True)
+    session = CompilationSession(input_path, scanner_class, error_limits, stats).compile(build_tree, passes)
+    saved = session.save(output_dir)
+    if cache:
+        files = {}
+        for name in saved:
+            with open(os.path.join(output_dir, name), newline='') as f:
+                files[name] = f.read()
+        cache.store(key, {'files': files, 'lexical_errors': session.lexical_error_count(),
+                          'syntax_errors': session.syntax_error_count(),
+                          'semantic_errors': session.semantic_error_count(),
+                          'optimization': session.optimization_report, 'frames': session.frames})
+    return (session.lexical_error_count(), session.syntax_error_count(), session.semantic_error_count(),
+            session.optimization_report, session.frames, False)
+
+
+def compile_file(job):
+    input_path, output_dir, cache, build_tree, passes, error_limits, scanner_class, trace_memory, profile = job
+    stats = Stats(trace_memory)
+    start = time.perf_counter()
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        counts = compile_to(input_path, output_dir, cache, build_tree, passes, error_limits, scanner_class, stats,
+                            profile)
+    except Exception as e:
+        return CompileResult(input_path, time.perf_counter() - start, 0, 0, 0, None, None, False,
+                             f'{type(e).__name__}: {e}', None)
+    return CompileResult(input_path, time.perf_counter() - start, *counts, None, stats.report())
+
+
+def run_batch(paths, output_root, workers=None, cache=None, build_tree=True, passes=PASSES, optimization_report=False,
+              frame_report=False, error_limits=DEFAULT_ERROR_LIMITS, scanner_class=TableScanner, trace_memory=False,
+              profile=False, summary_file=None):
+    jobs = [(path, output_dir, cache, build_tree, passes, error_limits, scanner_class, trace_memory, profile)
+            for path, output_dir in zip(paths, get_output_dirs(paths, output_root))]
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    # the grammar tables are loaded once per worker, not once per file
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_first_follow) as executor:
+        results = list(executor.map(compile_file, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    if cache:
+        cache.evict()
+    print_summary(results, time.perf_counter() - start, optimization_report, frame_report, summary_file)
+    return results
+
+
+def print_summary(results, wall_time, optimization_report=False, frame_report=False, file=None):
+    file = file or sys.stdout
+    for result in results:
+        if result.failure:
+            print(f'{result.input_path}\tFAILED\t{result.failure}', file=file)
+        else:
+            print(f'{result.input_path}\t{result.seconds * 1000:.1f} ms{" (cached)" if result.cache_hit else ""}\t'
+                  f'lexical errors: {result.lexical_errors}\tsyntax errors: {result.syntax_errors}\t'
+                  f'semantic errors: {result.semantic_errors}'
+                  + (f'\t{format_report(result.optimization)}' if optimization_report and result.optimization else ''),
+                  file=file)
+            if frame_report and result.frames:
+                print(format_frames(result.frames, '\t'), file=file)
+    print(f'{len(results)} files, {sum(1 for result in results if result.failure)} failed, '
+          f'{sum(1 for result in results if result.cache_hit)} cached, '
+          f'{sum(result.lexical_errors for result in results)} lexical errors, '
+          f'{sum(result.syntax_errors for result in results)} syntax errors, '
+          f'{sum(result.semantic_errors for result in results)} semantic errors, '
+          f'{wall_time:.2f} s wall, {sum(result.seconds for result in results):.2f} s compiling', file=file)
+
+
+def write_stats(results, path, wall_time):
+    """Writes the phase stats of each compiled input and their totals as JSON to path, '-' for stdout."""
+    files = [dict(result.stats, input_path=result.input_path, seconds=result.seconds, cache_hit=result.cache_hit)
+             for result in results if result.stats is not None]
+    total = dict(merge_reports(files), files=len(files), wall=wall_time)
+    text = json.dumps({'files': files, 'total': total}, indent=2)
+    if path == '-':
+        print(text)
+    else:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(
+        description='Compiles input.txt into the current directory, or compiles a batch of inputs in parallel.')
+    arg_parser.add_argument('inputs', nargs='*', help='input files, directories or glob patterns')
+    arg_parser.add_argument('--files-from', help='file listing one input path per line')
+    arg_parser.add_argument('-o', '--output-dir', default='output', help='root of the per-input output directories')
+    arg_parser.add_argument('-p', '--pattern', default='**/input.txt', help='inputs to pick inside directories')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    arg_parser.add_argument('--cache-dir', help='reuse outputs of unchanged inputs from this cache directory')
+    arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES,
+                            help='bytes the cache may hold before least recently used entries are evicted')
+    arg_parser.add_argument('--no-parse-tree', dest='build_tree', action='store_false',
+                            help='generate code without building the parse tree or writing parse_tree.txt')
+    arg_parser.add_argument('--no-optimize', action='store_true', help='write the generated code unoptimized')
+    for name in PASSES:
+        arg_parser.add_argument(f'--no-{name.replace("_", "-")}', dest='skipped_passes', action='append_const',
+                                const=name, default=[], help=f'skip the {name} optimizer pass')
+    arg_parser.add_argument('--optimization-report', action='store_true',
+                            help='print the instruction counts before and after optimizing')
+    arg_parser.add_argument('--frame-report', action='store_true',
+                            help="print each function's cells, most live temporaries and saved recursive frame")
+    arg_parser.add_argument('--max-errors', type=int, default=DEFAULT_ERROR_LIMITS.per_file,
+                            help='syntax errors per file after which parsing stops (0: no limit)')
+    arg_parser.add_argument('--max-line-errors', type=int, default=DEFAULT_ERROR_LIMITS.per_line,
+                            help='syntax errors recorded per line (0: no limit)')
+    arg_parser.add_argument('--parallel-lex', action='store_true',
+                            help='scan inputs larger than a few megabytes in parallel parts')
+    arg_parser.add_argument('--stats', nargs='?', const='-', metavar='PATH',
+                            help='write the time, memory and counts of each phase as JSON to PATH (default: stdout, '
+                                 'which moves the other reports to stderr)')
+    arg_parser.add_argument('--trace-memory', action='store_true',
+                            help='record the peak memory of each phase in the stats with tracemalloc')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help=f'profile each compilation with cProfile into {PROFILE_FILE} in its output directory')
+    args = arg_parser.parse_args(argv)
+
+    error_limits = ErrorLimits(args.max_errors or None, args.max_line_errors or None)
+    scanner_class = ParallelScanner if args.parallel_lex else TableScanner
+    passes = [] if args.no_optimize else [name for name in PASSES if name not in args.skipped_passes]
+    cache = CompileCache(args.cache_dir, args.cache_size) if args.cache_dir else None
+    # the JSON stats on stdout stay parseable
+    report_file = sys.stderr if args.stats == '-' else sys.stdout
+    if not args.inputs and not args.files_from:
+        stats = Stats(args.trace_memory)
+        start = time.perf_counter()
+        counts = compile_to("input.txt", '.', cache, args.build_tree, passes, error_limits, scanner_class, stats,
+                            args.profile)
+        result = CompileResult("input.txt", time.perf_counter() - start, *counts, None, stats.report())
+        if args.optimization_report and result.optimization:
+            print(format_report(result.optimization), file=report_file)
+        if args.frame_report and result.frames:
+            print(format_frames(result.frames), file=report_file)
+        if args.stats:
+            write_stats([result], args.stats, result.seconds)
+        if cache:
+            cache.evict()
+        return 0
+    paths = collect_inputs(args.inputs, args.pattern, args.files_from)
+    if not paths:
+        print('No input files found.', file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    results = run_batch(paths, args.output_dir, args.jobs, cache, args.build_tree, passes, args.optimization_report,
+                        args.frame_report, error_limits, scanner_class, args.trace_memory, args.profile, report_file)
+    if args.stats:
+        write_stats(results, args.stats, time.perf_counter() - start)
+    return 1 if any(result.failure for result in results) else 0
+
 
 if __name__ == '__main__':
-    init_symbol_table()
-    init_first_follow()
-    compiler_scanner = Scanner("input.txt")
-    compiler_parser = Parser(compiler_scanner)
-    compiler_parser.parse_program()
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Long-running compiler front end for editors. Requests and responses are JSON objects, one per line, on stdin and
+stdout; the grammar tables and the tokens of every open document stay in memory between requests.
+> python3 daemon.py
+> python3 daemon.py --watch input.txt
+Requests name a command and a document path:
+    {"id": 1, "command": "open", "path": "input.txt"}                 reads the file, or takes "text" instead
+    {"id": 2, "command": "edit", "path": "input.txt", "line": 3, "remove": 1, "text": "x = 1;\\n"}
+    {"id": 3, "command": "update", "path": "input.txt", "text": "..."}    replaces the whole text
+    {"id": 4, "command": "close", "path": "input.txt"}
+    {"id": 5, "command": "shutdown"}
+An edit replaces "remove" lines starting at 1-based "line" with "text". Responses echo the id and carry the
+lexical and syntax errors of the document as [line, message] pairs, as lexical_errors.txt and syntax_errors.txt
+would list them, the number of lines re-lexed and the seconds the request took; a failed request has "ok": false
+and an "error".
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from parser import DEFAULT_ERROR_LIMITS, ErrorLimits, ParseListener, init_first_follow
+from scanner import TableScanner
+from session import CompilationSession
+
+WATCH_INTERVAL = 0.2
+
+
+def split_lines(text):
+    """Splits text after each newline, the only character the scanner counts lines by."""
+    parts = text.split('\n')
+    return [part + '\n' for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+
+
+def normalize_newlines(text):
+    # the scanner reads files with universal newlines
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class Document:
+    """
+    The text of an open document as lines, with the tokens and lexical errors of each line. The scanner ends
+    every token at a newline and is back in its start state after it, so every line start is a safe restart
+    point: an edit re-lexes only the lines it replaces, and the lines around them keep their tokens.
+    """
+
+    def __init__(self, path, text, error_limits=DEFAULT_ERROR_LIMITS):
+        self.path = path
+        self.error_limits = error_limits
+        # interns the names of every version of the document
+        self.session = CompilationSession(path, error_limits=error_limits)
+        self.lines = []
+        self.line_tokens = []
+        self.line_errors = []
+        self.edit(0, 0, text)
+
+    def edit(self, first, removed, text):
+        """Replaces removed lines from the 0-based line first with text; returns the number of lines re-lexed."""
+        last = min(first + removed, len(self.lines))
+        first = min(first, last)
+        # the edited lines are whole lines of the new text
+        if first > 0 and not self.lines[first - 1].endswith('\n'):
+            first -= 1
+            text = self.lines[first] + text
+        if text and not text.endswith('\n') and last < len(self.lines):
+            text += self.lines[last]
+            last += 1
+        lines = split_lines(normalize_newlines(text))
+        tokens, errors = self.lex(lines, first)
+        self.lines[first:last] = lines
+        self.line_tokens[first:last] = tokens
+        self.line_errors[first:last] = errors
+        return len(lines)
+
+    def update(self, text):
+        """Replaces the whole text, re-lexing only the lines between the unchanged first and last lines."""
+        lines = split_lines(normalize_newlines(text))
+        first = 0
+        while first < min(len(lines), len(self.lines)) and lines[first] == self.lines[first]:
+            first += 1
+        unchanged = 0
+        while (unchanged < min(len(lines), len(self.lines)) - first
+               and lines[-1 - unchanged] == self.lines[-1 - unchanged]):
+            unchanged += 1
+        return self.edit(first, len(self.lines) - unchanged - first, ''.join(lines[first:len(lines) - unchanged]))
+
+    def lex(self, lines, first):
+        """Scans lines, the first of which is line first of the document; returns their tokens and errors."""
+        scanner = TableScanner(self.path, self.session)
+        scanner.line_number = first
+        scanner.lexical_errors = defaultdict(list)
+        tokens = [[] for _ in lines]
+        for line_number, kind, lexeme in scanner.scan_chunks(lines):
+            tokens[line_number - first].append((kind, lexeme))
+        return tokens, [scanner.lexical_errors.get(first + index, []) for index in range(len(lines))]
+
+    def lexical_errors(self):
+        return [[line_number + 1, error] for line_number, errors in enumerate(self.line_errors) for error in errors]
+
+    def syntax_errors(self):
+        """Parses the current tokens without building a tree."""
+        session = CompilationSession(self.path, error_limits=self.error_limits)
+        append = session.tokens.append
+        for line_number, tokens in enumerate(self.line_tokens):
+            for kind, lexeme in tokens:
+                append(line_number, kind, lexeme)
+        session.scanned = True
+        session.parse(ParseListener())
+        # like save_syntax_errors, errors reported on the first line are dropped
+        return [[line_number, error] for line_number, errors in session.syntax_errors.items() if line_number != 1
+                for error in errors]
+
+
+class Daemon:
+    def __init__(self, error_limits=DEFAULT_ERROR_LIMITS):
+        init_first_follow()
+        self.error_limits = error_limits
+        self.documents = {}
+        self.running = True
+
+    def handle(self, request):
+        """Runs one request and returns its response without the id and the timing."""
+        command = request['command']
+        if command == 'shutdown':
+            self.running = False
+            return {'ok': True}
+        path = request['path']
+        text = request.get('text')
+        if type(text) is not str and (command in ('edit', 'update') or command == 'open' and text is not None):
+            raise ValueError(f'"text" is a string, not {text!r}')
+        if command == 'open':
+            if text is None:
+                with open(path) as f:
+                    text = f.read()
+            document = self.documents[path] = Document(path, text, self.error_limits)
+            relexed = len(document.lines)
+        elif command == 'close':
+            del self.documents[path]
+            return {'ok': True, 'path': path}
+        elif command == 'edit':
+            line, removed = request['line'], request.get('remove', 0)
+            if type(line) is not int or line < 1:
+                raise ValueError(f'"line" is a line number from 1, not {line!r}')
+            if type(removed) is not int or removed < 0:
+                raise ValueError(f'"remove" is a count of lines, not {removed!r}')
+            relexed = self.documents[path].edit(line - 1, removed, text)
+        elif command == 'update':
+            relexed = self.documents[path].update(text)
+        else:
+            raise ValueError(f'unknown command {command!r}')
+        document = self.documents[path]
+        return {'ok': True, 'path': path, 'lexical_errors': document.lexical_errors(),
+                'syntax_errors': document.syntax_errors(), 'relexed_lines': relexed}
+
+    def respond(self, request):
+        start = time.perf_counter()
+        try:
+            response = self.handle(request)
+        except (KeyError, TypeError, ValueError, OSError) as e:
+            response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+        response['id'] = request.get('id')
+        response['seconds'] = time.perf_counter() - start
+        return response
+
+    def serve(self, requests=sys.stdin, responses=sys.stdout):
+        for line in requests:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('a request is a JSON object')
+            except ValueError as e:
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}', 'id': None}
+            else:
+                response = self.respond(request)
+            responses.write(json.dumps(response) + '\n')
+            responses.flush()
+            if not self.running:
+                break
+
+    def watch(self, paths, responses=sys.stdout, interval=WATCH_INTERVAL):
+        """Polls the files and writes the response to an update whenever one changes."""
+        mtimes = {}
+        while True:
+            for path in paths:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                if mtimes.get(path) == mtime:
+                    continue
+                mtimes[path] = mtime
+                if path in self.documents:
+                    try:
+                        with open(path) as f:
+                            request = {'command': 'update', 'path': path, 'text': f.read()}
+                    except OSError:
+                        continue
+                else:
+                    request = {'command': 'open', 'path': path}
+                responses.write(json.dumps(self.respond(request)) + '\n')
+                responses.flush()
+            time.sleep(interval)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Serves compiler diagnostics as JSON lines on stdin and stdout.')
+    arg_parser.add_argument('--watch', nargs='+', metavar='PATH',
+                            help='report the diagnostics of these files whenever they change instead of reading stdin')
+    arg_parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, help='seconds between polls of --watch')
+    arg_parser.add_argument('--max-errors', type=int, default=DEFAULT_ERROR_LIMITS.per_file,
+                            help='syntax errors per file after which parsing stops (0: no limit)')
+    arg_parser.add_argument('--max-line-errors', type=int, default=DEFAULT_ERROR_LIMITS.per_line,
+                            help='syntax errors recorded per line (0: no limit)')
+    args = arg_parser.parse_args(argv)
+
+    daemon = Daemon(ErrorLimits(args.max_errors or None, args.max_line_errors or None))
+    if args.watch:
+        try:
+            daemon.watch(args.watch, interval=args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        daemon.serve()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
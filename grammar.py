@@ -0,0 +1,167 @@
+"""
+Computes FIRST, FOLLOW and PREDICT sets of resource/grammar.txt and generates parse_table.py from them.
+> python3 grammar.py
+Symbols get dense integer ids: terminals are 0 .. len(TERMINALS) - 1 (END_SYMBOL is 0), nonterminals follow them,
+then the action symbols. Action symbols start with ACTION_PREFIX; they derive epsilon and do not affect the sets.
+"""
+import hashlib
+import importlib
+import os
+import pprint
+import tempfile
+
+RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource')
+GRAMMAR_PATH = os.path.join(RESOURCE_DIR, 'grammar.txt')
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parse_table.py')
+ARROW = '⟶'
+END_SYMBOL = '$'
+ACTION_PREFIX = '#'
+NO_RULE = -1
+
+
+def grammar_hash(path=GRAMMAR_PATH):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_grammar(path=GRAMMAR_PATH):
+    """Returns the rules as (left, [right symbols]) in file order; an empty right side is epsilon."""
+    rules = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                left, right = line.split(ARROW, 1)
+                rules.append((left.strip(), right.split()))
+    return rules
+
+
+def is_action(symbol):
+    return symbol.startswith(ACTION_PREFIX)
+
+
+def compute_first(rules, nonterminals):
+    """FIRST sets of the nonterminals; None stands for epsilon."""
+    first = {nt: set() for nt in nonterminals}
+    changed = True
+    while changed:
+        changed = False
+        for left, right in rules:
+            size = len(first[left])
+            first[left] |= first_of_sequence(right, first)
+            changed |= len(first[left]) != size
+    return first
+
+
+def first_of_sequence(symbols, first):
+    result = set()
+    for symbol in symbols:
+        if symbol not in first:
+            result.add(symbol)
+            return result
+        result |= first[symbol] - {None}
+        if None not in first[symbol]:
+            return result
+    result.add(None)
+    return result
+
+
+def compute_follow(rules, nonterminals, first):
+    follow = {nt: set() for nt in nonterminals}
+    follow[rules[0][0]].add(END_SYMBOL)
+    changed = True
+    while changed:
+        changed = False
+        for left, right in rules:
+            for i, symbol in enumerate(right):
+                if symbol not in follow:
+                    continue
+                size = len(follow[symbol])
+                rest = first_of_sequence(right[i + 1:], first)
+                follow[symbol] |= rest - {None}
+                if None in rest:
+                    follow[symbol] |= follow[left]
+                changed |= len(follow[symbol]) != size
+    return follow
+
+
+def compute_predict(rules, first, follow):
+    predict = []
+    for left, right in rules:
+        rest = first_of_sequence(right, first)
+        predict.append((rest - {None}) | (follow[left] if None in rest else set()))
+    return predict
+
+
+def build_tables(path=GRAMMAR_PATH):
+    """Builds the integer-coded tables written to parse_table.py."""
+    rules = read_grammar(path)
+    nonterminals = list(dict.fromkeys(left for left, _ in rules))
+    actions = list(dict.fromkeys(symbol for _, right in rules for symbol in right if is_action(symbol)))
+    terminals = [END_SYMBOL] + list(dict.fromkeys(symbol for _, right in rules for symbol in right
+                                                  if symbol not in nonterminals and not is_action(symbol)))
+    symbol_ids = {symbol: i for i, symbol in enumerate(terminals + nonterminals + actions)}
+    # the sets are computed on the grammar without its action symbols
+    syntax_rules = [(left, [symbol for symbol in right if not is_action(symbol)]) for left, right in rules]
+    first = compute_first(syntax_rules, nonterminals)
+    follow = compute_follow(syntax_rules, nonterminals, first)
+    predict = compute_predict(syntax_rules, first, follow)
+
+    table = len(nonterminals) * len(terminals) * [NO_RULE]
+    for rule_id, ((left, _), lookaheads) in enumerate(zip(rules, predict)):
+        row = (symbol_ids[left] - len(terminals)) * len(terminals)
+        for terminal in lookaheads:
+            if table[row + symbol_ids[terminal]] != NO_RULE:
+                raise ValueError(f'grammar is not LL(1): conflict on {left}, {terminal}')
+            table[row + symbol_ids[terminal]] = rule_id
+
+    def terminal_ids(symbols):
+        return tuple(sorted(symbol_ids[symbol] for symbol in symbols if symbol is not None))
+
+    return {
+        'GRAMMAR_HASH': grammar_hash(path),
+        'TERMINALS': tuple(terminals),
+        'NONTERMINALS': tuple(nonterminals),
+        'ACTIONS': tuple(actions),
+        'RULES': tuple((symbol_ids[left], tuple(symbol_ids[symbol] for symbol in right)) for left, right in rules),
+        'FIRST': tuple(terminal_ids(first[nt]) for nt in nonterminals),
+        'NULLABLE': tuple(None in first[nt] for nt in nonterminals),
+        'FOLLOW': tuple(terminal_ids(follow[nt]) for nt in nonterminals),
+        'PREDICT': tuple(terminal_ids(lookaheads) for lookaheads in predict),
+        'PARSE_TABLE': tuple(table),
+    }
+
+
+def write_tables(tables, path=TABLE_PATH):
+    # written to a temporary file and renamed, so processes regenerating the tables concurrently never import a
+    # partial module
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write('# Generated by grammar.py from resource/grammar.txt, do not edit.\n')
+        for name, value in tables.items():
+            # the width leaves room for the 'NAME = ' prefix of the first line
+            f.write(f'\n{name} = {pprint.pformat(value, width=120 - len(name) - 3, compact=True)}\n')
+    # mkstemp creates the file readable by its owner only
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+def load_tables():
+    """
+    Returns the generated parse_table module, regenerating it first when it is missing
+    or was generated from a different grammar.txt.
+    """
+    try:
+        import parse_table
+        if parse_table.GRAMMAR_HASH == grammar_hash():
+            return parse_table
+    except ImportError:
+        pass
+    write_tables(build_tables())
+    importlib.invalidate_caches()
+    import parse_table
+    return importlib.reload(parse_table)
+
+
+if __name__ == '__main__':
+    write_tables(build_tables())
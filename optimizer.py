@@ -0,0 +1,302 @@
+"""
+Optimization passes over the three-address code of codegen.CodeGenerator. Every pass rewrites the program in place
+and marks the instructions it deletes; compact() then drops them and renumbers the jump targets and return
+addresses. The passes only rely on what the generator guarantees: temporaries are private to the expression that
+computes them, code addresses appear only as jump targets and in the return address stores of calls, and indirect
+jumps only return from functions. A temporary's cell is reused by later expressions, but each expression stores
+its temporaries before reading them and a recursive call saves the live ones, so a read of a temporary sees the
+last store to its cell in code order.
+"""
+BINARY_OPERATIONS = {
+    'ADD': lambda a, b: a + b,
+    'SUB': lambda a, b: a - b,
+    'MULT': lambda a, b: a * b,
+    'DIV': lambda a, b: a // b,
+    'LT': lambda a, b: int(a < b),
+    'EQ': lambda a, b: int(a == b),
+    'AND': lambda a, b: a & b,
+}
+JUMPS = ('JP', 'JPF')
+PASSES = ['fold', 'propagate', 'dead_stores', 'jumps', 'peephole']
+MAX_ROUNDS = 10
+# longest chain of jumps to jumps followed, so a loop of jumps can not hang the optimizer
+MAX_THREADING = 100
+
+
+def is_immediate(operand):
+    return operand.startswith('#')
+
+
+def is_indirect(operand):
+    return operand.startswith('@')
+
+
+def immediate(operand):
+    return int(operand[1:])
+
+
+class Program:
+    """
+    The code being optimized, with the set of cells that are temporaries and the indices of the instructions that
+    store a return address, (ASSIGN, #return address, return address cell).
+    """
+
+    def __init__(self, code, temporaries=(), return_sites=()):
+        self.code = list(code)
+        self.temporaries = set(temporaries)
+        self.return_sites = set(return_sites)
+
+    def __len__(self):
+        return len(self.code)
+
+    def targets(self):
+        """The pcs control can arrive at other than from the instruction before."""
+        targets = {0}
+        for instruction in filter(None, self.code):
+            if instruction[0] == 'JP' and not is_indirect(instruction[1]):
+                targets.add(int(instruction[1]))
+            elif instruction[0] == 'JPF':
+                targets.add(int(instruction[2]))
+        targets.update(immediate(self.code[site][1]) for site in self.return_sites)
+        return targets
+
+    def leaders(self):
+        leaders = self.targets()
+        leaders.update(pc + 1 for pc, instruction in enumerate(self.code) if instruction and instruction[0] == 'JP')
+        return leaders
+
+    def definition_reads(self):
+        """
+        Maps the pc of each store to a temporary to the number of reads of the stored value; reading @x reads x
+        and a cell that is never a temporary.
+        """
+        counts = {}
+        definitions = {}
+        for pc, instruction in enumerate(self.code):
+            if instruction is None:
+                continue
+            operands = read_operands(instruction)
+            destination = write_operand(instruction)
+            if destination is not None and is_indirect(destination):
+                operands.append(destination)
+            for operand in operands:
+                definition = definitions.get(operand.lstrip('@'))
+                if definition is not None:
+                    counts[definition] += 1
+            if destination in self.temporaries:
+                definitions[destination] = pc
+                counts[pc] = 0
+        return counts
+
+    def compact(self):
+        """Drops the deleted (None) instructions; jumps to a deleted instruction go to the next one kept."""
+        new_pcs = []
+        kept = 0
+        for instruction in self.code:
+            new_pcs.append(kept)
+            if instruction is not None:
+                kept += 1
+        new_pcs.append(kept)
+        return_sites = {new_pcs[site] for site in self.return_sites if self.code[site] is not None}
+        code = []
+        for pc, instruction in enumerate(self.code):
+            if instruction is None:
+                continue
+            if instruction[0] == 'JP' and not is_indirect(instruction[1]):
+                instruction = ('JP', str(new_pcs[int(instruction[1])]))
+            elif instruction[0] == 'JPF':
+                instruction = ('JPF', instruction[1], str(new_pcs[int(instruction[2])]))
+            elif pc in self.return_sites:
+                instruction = ('ASSIGN', f'#{new_pcs[immediate(instruction[1])]}', instruction[2])
+            code.append(instruction)
+        self.code = code
+        self.return_sites = return_sites
+
+
+def read_positions(instruction):
+    """The positions of the operands an instruction reads, not counting the pointer of an indirect destination."""
+    operation = instruction[0]
+    if operation in BINARY_OPERATIONS:
+        return 1, 2
+    if operation in ('ASSIGN', 'JPF', 'PRINT') or (operation == 'JP' and is_indirect(instruction[1])):
+        return 1,
+    return ()
+
+
+def read_operands(instruction):
+    return [instruction[position] for position in read_positions(instruction)]
+
+
+def write_operand(instruction):
+    operation = instruction[0]
+    if operation in BINARY_OPERATIONS:
+        return instruction[3]
+    if operation == 'ASSIGN':
+        return instruction[2]
+    return None
+
+
+def fold(program):
+    """Evaluates operations on immediates and conditional jumps on an immediate condition."""
+    code = program.code
+    for pc, instruction in enumerate(code):
+        operation = instruction[0]
+        if operation in BINARY_OPERATIONS and is_immediate(instruction[1]) and is_immediate(instruction[2]):
+            if operation == 'DIV' and immediate(instruction[2]) == 0:
+                continue
+            value = BINARY_OPERATIONS[operation](immediate(instruction[1]), immediate(instruction[2]))
+            code[pc] = ('ASSIGN', f'#{value}', instruction[3])
+        elif operation == 'JPF' and is_immediate(instruction[1]):
+            code[pc] = ('JP', instruction[2]) if immediate(instruction[1]) == 0 else None
+
+
+def propagate(program):
+    """
+    Replaces reads of cells whose value is known within a basic block: a cell last assigned an immediate reads as
+    the immediate and a cell last assigned a copy of another unchanged cell reads as that cell.
+    """
+    code = program.code
+    leaders = program.leaders()
+    known = {}
+    for pc, instruction in enumerate(code):
+        if pc in leaders:
+            known.clear()
+        operands = list(instruction)
+        for position in read_positions(instruction):
+            operands[position] = substitute(operands[position], known)
+        destination = write_operand(instruction)
+        if destination is not None and is_indirect(destination):
+            # the pointer is read too
+            operands[-1] = substitute(destination, known)
+        instruction = code[pc] = tuple(operands)
+        destination = write_operand(instruction)
+        if destination is None:
+            continue
+        if is_indirect(destination):
+            known.clear()
+            continue
+        known.pop(destination, None)
+        for cell in [cell for cell, value in known.items() if value == destination]:
+            del known[cell]
+        if instruction[0] == 'ASSIGN' and not is_indirect(instruction[1]) and instruction[1] != destination:
+            known[destination] = instruction[1]
+
+
+def substitute(operand, known):
+    if is_immediate(operand):
+        return operand
+    if is_indirect(operand):
+        pointer = known.get(operand[1:])
+        if pointer is None:
+            return operand
+        return pointer[1:] if is_immediate(pointer) else '@' + pointer
+    return known.get(operand, operand)
+
+
+def dead_stores(program):
+    """Deletes the stores to temporaries that are never read."""
+    code = program.code
+    changed = True
+    while changed:
+        changed = False
+        reads = program.definition_reads()
+        for pc, instruction in enumerate(code):
+            if reads.get(pc) != 0:
+                continue
+            # a division by a cell may fail at run time, which has to stay observable
+            if instruction[0] == 'DIV' and not (is_immediate(instruction[2]) and immediate(instruction[2]) != 0):
+                continue
+            code[pc] = None
+            changed = True
+        if changed:
+            program.compact()
+            code = program.code
+
+
+def jumps(program):
+    """Threads jumps to jumps, and deletes jumps to the next instruction and code no jump reaches."""
+    code = program.code
+
+    def thread(target):
+        for _ in range(MAX_THREADING):
+            if target >= len(code) or code[target][0] != 'JP' or is_indirect(code[target][1]):
+                break
+            target = int(code[target][1])
+        return target
+
+    for pc, instruction in enumerate(code):
+        if instruction[0] == 'JP' and not is_indirect(instruction[1]):
+            code[pc] = ('JP', str(thread(int(instruction[1]))))
+        elif instruction[0] == 'JPF':
+            code[pc] = ('JPF', instruction[1], str(thread(int(instruction[2]))))
+    targets = program.targets()
+    reachable = True
+    for pc, instruction in enumerate(code):
+        reachable = reachable or pc in targets
+        if not reachable:
+            code[pc] = None
+            continue
+        if instruction[0] == 'JP':
+            reachable = False
+        target = instruction[-1]
+        if instruction[0] in JUMPS and not is_indirect(target) and int(target) == pc + 1:
+            code[pc] = None
+
+
+def peephole(program):
+    """
+    Rewrites operations with an identity operand into copies, deletes self copies, and stores a result directly
+    in its destination when it was computed into a temporary only to be copied there.
+    """
+    code = program.code
+    for pc, instruction in enumerate(code):
+        operation = instruction[0]
+        if operation in ('ADD', 'SUB', 'MULT', 'DIV'):
+            a, b, destination = instruction[1:]
+            if (operation in ('ADD', 'SUB') and b == '#0') or (operation in ('MULT', 'DIV') and b == '#1'):
+                code[pc] = ('ASSIGN', a, destination)
+            elif (operation == 'ADD' and a == '#0') or (operation == 'MULT' and a == '#1'):
+                code[pc] = ('ASSIGN', b, destination)
+            elif operation == 'MULT' and '#0' in (a, b):
+                code[pc] = ('ASSIGN', '#0', destination)
+        if code[pc][0] == 'ASSIGN' and code[pc][1] == code[pc][2]:
+            code[pc] = None
+    reads = program.definition_reads()
+    targets = program.targets()
+    for pc in range(len(code) - 1):
+        instruction, copy = code[pc], code[pc + 1]
+        if (instruction is None or copy is None or pc + 1 in targets or copy[0] != 'ASSIGN'
+                or instruction[0] not in BINARY_OPERATIONS and instruction[0] != 'ASSIGN'):
+            continue
+        if copy[1] == write_operand(instruction) and reads.get(pc) == 1:
+            code[pc] = instruction[:-1] + (copy[2],)
+            code[pc + 1] = None
+
+
+PASS_FUNCTIONS = {'fold': fold, 'propagate': propagate, 'dead_stores': dead_stores, 'jumps': jumps,
+                  'peephole': peephole}
+
+
+def optimize(program, passes=PASSES):
+    """
+    Runs the passes, in PASSES order, until the code stops changing. Returns a report of the instruction count
+    before and after and of the instructions each pass removed.
+    """
+    report = {'before': len(program), 'removed': dict.fromkeys(passes, 0)}
+    for _ in range(MAX_ROUNDS):
+        previous = program.code
+        for name in PASSES:
+            if name in passes:
+                size = len(program)
+                PASS_FUNCTIONS[name](program)
+                program.compact()
+                report['removed'][name] += size - len(program)
+        if program.code == previous:
+            break
+    report['after'] = len(program)
+    return report
+
+
+def format_report(report):
+    removed = ', '.join(f'{name} -{count}' for name, count in report['removed'].items())
+    return f'instructions: {report["before"]} -> {report["after"]}' + (f' ({removed})' if removed else '')
@@ -0,0 +1,128 @@
+# Generated by grammar.py from resource/grammar.txt, do not edit.
+
+GRAMMAR_HASH = 'da85519c7ab9d376b2cd92d5a46a910456f600a9d2ef1c2ad7e9ba678f4c8f69'
+
+TERMINALS = ('$', 'ID', ';', '[', 'NUM', ']', '(', ')', 'int', 'void', ',', '{', '}', 'break', 'if', 'endif', 'else',
+ 'while', 'return', '=', '<', '==', '+', '-', '*', '/')
+
+NONTERMINALS = ('Program', 'DeclarationList', 'Declaration', 'DeclarationInitial', 'DeclarationPrime',
+ 'VarDeclarationPrime', 'FunDeclarationPrime', 'TypeSpecifier', 'Params', 'ParamList', 'Param',
+ 'ParamPrime', 'CompoundStmt', 'StatementList', 'Statement', 'ExpressionStmt', 'SelectionStmt',
+ 'ElseStmt', 'IterationStmt', 'ReturnStmt', 'ReturnStmtPrime', 'Expression', 'B', 'H',
+ 'SimpleExpressionZegond', 'SimpleExpressionPrime', 'C', 'Relop', 'AdditiveExpression',
+ 'AdditiveExpressionPrime', 'AdditiveExpressionZegond', 'D', 'Addop', 'Term', 'TermPrime', 'TermZegond',
+ 'G', 'Mulop', 'SignedFactor', 'SignedFactorPrime', 'SignedFactorZegond', 'Factor', 'VarCallPrime',
+ 'VarPrime', 'FactorPrime', 'FactorZegond', 'Args', 'ArgList', 'ArgListPrime')
+
+ACTIONS = ('#end_program', '#pname', '#declare_var', '#pnum', '#declare_array', '#declare_function', '#end_function',
+ '#ptype', '#declare_array_param', '#declare_param', '#begin_scope', '#end_scope', '#pop', '#break', '#save',
+ '#jpf', '#jpf_save', '#jp', '#label', '#while', '#return', '#return_value', '#pid', '#assign', '#index',
+ '#binary', '#push_op', '#negate', '#begin_args', '#call')
+
+RULES = ((26, (27, 75)), (27, (28, 27)), (27, ()), (28, (29, 30)), (29, (33, 76, 1)), (30, (32,)), (30, (31,)),
+ (31, (77, 2)), (31, (3, 78, 4, 5, 79, 2)), (32, (80, 6, 34, 7, 38, 81)), (33, (82, 8)), (33, (82, 9)),
+ (34, (82, 8, 76, 1, 37, 35)), (34, (9,)), (35, (10, 36, 35)), (35, ()), (36, (29, 37)), (37, (3, 5, 83)),
+ (37, (84,)), (38, (11, 85, 27, 39, 86, 12)), (39, (40, 39)), (39, ()), (40, (41,)), (40, (38,)), (40, (42,)),
+ (40, (44,)), (40, (45,)), (41, (47, 87, 2)), (41, (88, 13, 2)), (41, (2,)), (42, (14, 6, 47, 7, 89, 40, 43)),
+ (43, (90, 15)), (43, (16, 91, 40, 92, 15)), (44, (17, 93, 6, 47, 7, 89, 40, 94)), (45, (18, 46)),
+ (46, (95, 2)), (46, (47, 96, 2)), (47, (50,)), (47, (97, 1, 48)), (48, (19, 47, 98)), (48, (3, 47, 5, 99, 49)),
+ (48, (51,)), (49, (19, 47, 98)), (49, (62, 57, 52)), (50, (56, 52)), (51, (55, 52)), (52, (53, 54, 100)),
+ (52, ()), (53, (101, 20)), (53, (101, 21)), (54, (59, 57)), (55, (60, 57)), (56, (61, 57)),
+ (57, (58, 59, 100, 57)), (57, ()), (58, (101, 22)), (58, (101, 23)), (59, (64, 62)), (60, (65, 62)),
+ (61, (66, 62)), (62, (63, 64, 100, 62)), (62, ()), (63, (101, 24)), (63, (101, 25)), (64, (22, 67)),
+ (64, (23, 67, 102)), (64, (67,)), (65, (70,)), (66, (22, 67)), (66, (23, 67, 102)), (66, (71,)),
+ (67, (6, 47, 7)), (67, (97, 1, 68)), (67, (78, 4)), (68, (6, 103, 72, 104, 7)), (68, (69,)),
+ (69, (3, 47, 5, 99)), (69, ()), (70, (6, 103, 72, 104, 7)), (70, ()), (71, (6, 47, 7)), (71, (78, 4)),
+ (72, (73,)), (72, ()), (73, (47, 74)), (74, (10, 47, 74)), (74, ()))
+
+FIRST = ((8, 9), (8, 9), (8, 9), (8, 9), (2, 3, 6), (2, 3), (6,), (8, 9), (8, 9), (10,), (8, 9), (3,), (11,),
+ (1, 2, 4, 6, 11, 13, 14, 17, 18, 22, 23), (1, 2, 4, 6, 11, 13, 14, 17, 18, 22, 23), (1, 2, 4, 6, 13, 22, 23),
+ (14,), (15, 16), (17,), (18,), (1, 2, 4, 6, 22, 23), (1, 4, 6, 22, 23), (3, 6, 19, 20, 21, 22, 23, 24, 25),
+ (19, 20, 21, 22, 23, 24, 25), (4, 6, 22, 23), (6, 20, 21, 22, 23, 24, 25), (20, 21), (20, 21),
+ (1, 4, 6, 22, 23), (6, 22, 23, 24, 25), (4, 6, 22, 23), (22, 23), (22, 23), (1, 4, 6, 22, 23), (6, 24, 25),
+ (4, 6, 22, 23), (24, 25), (24, 25), (1, 4, 6, 22, 23), (6,), (4, 6, 22, 23), (1, 4, 6), (3, 6), (3,), (6,),
+ (4, 6), (1, 4, 6, 22, 23), (1, 4, 6, 22, 23), (10,))
+
+NULLABLE = (True, True, False, False, False, False, False, False, False, True, False, True, False, True, False, False,
+ False, False, False, False, False, False, True, True, False, True, True, False, False, True, False, True,
+ False, False, True, False, True, False, False, True, False, False, True, True, True, False, True, False,
+ True)
+
+FOLLOW = ((0,), (0, 1, 2, 4, 6, 11, 12, 13, 14, 17, 18, 22, 23), (0, 1, 2, 4, 6, 8, 9, 11, 12, 13, 14, 17, 18, 22, 23),
+ (2, 3, 6, 7, 10), (0, 1, 2, 4, 6, 8, 9, 11, 12, 13, 14, 17, 18, 22, 23),
+ (0, 1, 2, 4, 6, 8, 9, 11, 12, 13, 14, 17, 18, 22, 23), (0, 1, 2, 4, 6, 8, 9, 11, 12, 13, 14, 17, 18, 22, 23),
+ (1,), (7,), (7,), (7, 10), (7, 10), (0, 1, 2, 4, 6, 8, 9, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23), (12,),
+ (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23), (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23),
+ (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23), (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23),
+ (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23), (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23),
+ (1, 2, 4, 6, 11, 12, 13, 14, 15, 16, 17, 18, 22, 23), (2, 5, 7, 10), (2, 5, 7, 10), (2, 5, 7, 10),
+ (2, 5, 7, 10), (2, 5, 7, 10), (2, 5, 7, 10), (1, 4, 6, 22, 23), (2, 5, 7, 10), (2, 5, 7, 10, 20, 21),
+ (2, 5, 7, 10, 20, 21), (2, 5, 7, 10, 20, 21), (1, 4, 6, 22, 23), (2, 5, 7, 10, 20, 21, 22, 23),
+ (2, 5, 7, 10, 20, 21, 22, 23), (2, 5, 7, 10, 20, 21, 22, 23), (2, 5, 7, 10, 20, 21, 22, 23),
+ (1, 4, 6, 22, 23), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25),
+ (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25),
+ (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25),
+ (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (7,), (7,), (7,))
+
+PREDICT = ((0, 8, 9), (8, 9), (0, 1, 2, 4, 6, 11, 12, 13, 14, 17, 18, 22, 23), (8, 9), (8, 9), (6,), (2, 3), (2,), (3,),
+ (6,), (8,), (9,), (8,), (9,), (10,), (7,), (8, 9), (3,), (7, 10), (11,),
+ (1, 2, 4, 6, 11, 13, 14, 17, 18, 22, 23), (12,), (1, 2, 4, 6, 13, 22, 23), (11,), (14,), (17,), (18,),
+ (1, 4, 6, 22, 23), (13,), (2,), (14,), (15,), (16,), (17,), (18,), (2,), (1, 4, 6, 22, 23), (4, 6, 22, 23),
+ (1,), (19,), (3,), (2, 5, 6, 7, 10, 20, 21, 22, 23, 24, 25), (19,), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25),
+ (4, 6, 22, 23), (2, 5, 6, 7, 10, 20, 21, 22, 23, 24, 25), (20, 21), (2, 5, 7, 10), (20,), (21,),
+ (1, 4, 6, 22, 23), (2, 5, 6, 7, 10, 20, 21, 22, 23, 24, 25), (4, 6, 22, 23), (22, 23), (2, 5, 7, 10, 20, 21),
+ (22,), (23,), (1, 4, 6, 22, 23), (2, 5, 6, 7, 10, 20, 21, 22, 23, 24, 25), (4, 6, 22, 23), (24, 25),
+ (2, 5, 7, 10, 20, 21, 22, 23), (24,), (25,), (22,), (23,), (1, 4, 6),
+ (2, 5, 6, 7, 10, 20, 21, 22, 23, 24, 25), (22,), (23,), (4, 6), (6,), (1,), (4,), (6,),
+ (2, 3, 5, 7, 10, 20, 21, 22, 23, 24, 25), (3,), (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (6,),
+ (2, 5, 7, 10, 20, 21, 22, 23, 24, 25), (6,), (4,), (1, 4, 6, 22, 23), (7,), (1, 4, 6, 22, 23), (10,), (7,))
+
+PARSE_TABLE = (0, -1, -1, -1, -1, -1, -1, -1, 0, 0, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 2,
+ 2, 2, -1, 2, -1, 2, -1, 1, 1, -1, 2, 2, 2, 2, -1, -1, 2, 2, -1, -1, -1, 2, 2, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, 3, 3, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, 4, 4, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 6, 6, -1, -1, 5,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 7, 8, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 9, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ 10, 11, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ 12, 13, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 15,
+ -1, -1, 14, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ 16, 16, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 17, -1, -1, -1, 18,
+ -1, -1, 18, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, 19, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 20, 20, -1, 20, -1, 20, -1,
+ -1, -1, -1, 20, 21, 20, 20, -1, -1, 20, 20, -1, -1, -1, 20, 20, -1, -1, -1, 22, 22, -1, 22, -1, 22, -1,
+ -1, -1, -1, 23, -1, 22, 24, -1, -1, 25, 26, -1, -1, -1, 22, 22, -1, -1, -1, 27, 29, -1, 27, -1, 27, -1,
+ -1, -1, -1, -1, -1, 28, -1, -1, -1, -1, -1, -1, -1, -1, 27, 27, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, 30, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, 31, 32, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, 33, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 34, -1, -1, -1, -1, -1, -1, -1, -1, 36, 35, -1, 36, -1, 36, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 36, 36, -1, -1, -1, 38, -1, -1, 37, -1, 37, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 37, 37, -1, -1, -1, -1, 41, 40, -1, 41, 41, 41,
+ -1, -1, 41, -1, -1, -1, -1, -1, -1, -1, -1, 39, 41, 41, 41, 41, 41, 41, -1, -1, 43, -1, -1, 43, -1, 43,
+ -1, -1, 43, -1, -1, -1, -1, -1, -1, -1, -1, 42, 43, 43, 43, 43, 43, 43, -1, -1, -1, -1, 44, -1, 44, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 44, 44, -1, -1, -1, -1, 45, -1, -1, 45, 45, 45,
+ -1, -1, 45, -1, -1, -1, -1, -1, -1, -1, -1, -1, 45, 45, 45, 45, 45, 45, -1, -1, 47, -1, -1, 47, -1, 47,
+ -1, -1, 47, -1, -1, -1, -1, -1, -1, -1, -1, -1, 46, 46, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 48, 49, -1, -1, -1, -1, -1, 50, -1, -1, 50, -1, 50, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 50, 50, -1, -1, -1, -1, 51, -1, -1, 51, 51, 51,
+ -1, -1, 51, -1, -1, -1, -1, -1, -1, -1, -1, -1, 51, 51, 51, 51, 51, 51, -1, -1, -1, -1, 52, -1, 52, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 52, 52, -1, -1, -1, -1, 54, -1, -1, 54, -1, 54,
+ -1, -1, 54, -1, -1, -1, -1, -1, -1, -1, -1, -1, 54, 54, 53, 53, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 55, 56, -1, -1, -1, 57, -1, -1, 57, -1, 57, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 57, 57, -1, -1, -1, -1, 58, -1, -1, 58, 58, 58,
+ -1, -1, 58, -1, -1, -1, -1, -1, -1, -1, -1, -1, 58, 58, 58, 58, 58, 58, -1, -1, -1, -1, 59, -1, 59, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 59, 59, -1, -1, -1, -1, 61, -1, -1, 61, -1, 61,
+ -1, -1, 61, -1, -1, -1, -1, -1, -1, -1, -1, -1, 61, 61, 61, 61, 60, 60, -1, -1, -1, -1, -1, -1, -1, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 62, 63, -1, 66, -1, -1, 66, -1, 66, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 64, 65, -1, -1, -1, -1, 67, -1, -1, 67, 67, 67,
+ -1, -1, 67, -1, -1, -1, -1, -1, -1, -1, -1, -1, 67, 67, 67, 67, 67, 67, -1, -1, -1, -1, 70, -1, 70, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 68, 69, -1, -1, -1, 72, -1, -1, 73, -1, 71, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 75, 75, -1, 75, 74, 75,
+ -1, -1, 75, -1, -1, -1, -1, -1, -1, -1, -1, -1, 75, 75, 75, 75, 75, 75, -1, -1, 77, 76, -1, 77, -1, 77,
+ -1, -1, 77, -1, -1, -1, -1, -1, -1, -1, -1, -1, 77, 77, 77, 77, 77, 77, -1, -1, 79, -1, -1, 79, 78, 79,
+ -1, -1, 79, -1, -1, -1, -1, -1, -1, -1, -1, -1, 79, 79, 79, 79, 79, 79, -1, -1, -1, -1, 81, -1, 80, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 82, -1, -1, 82, -1, 82, 83,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 82, 82, -1, -1, -1, 84, -1, -1, 84, -1, 84, -1,
+ -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 84, 84, -1, -1, -1, -1, -1, -1, -1, -1, -1, 86,
+ -1, -1, 85, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1)
@@ -1,177 +1,298 @@
-from collections import defaultdict
+from collections import namedtuple
 
-from anytree import AnyNode, RenderTree
-
-import scanner
+from grammar import END_SYMBOL, NO_RULE, load_tables
 from scanner import *
+from tree import ParseTree
+
+# the path of an epsilon rule starts with EPSILON, followed by its actions
+EPSILON = -1
+LINE_LIMIT_MESSAGE = 'too many errors on this line'
+FILE_LIMIT_MESSAGE = 'too many errors, parsing stopped'
+
+# the most syntax errors recorded per file and per line, None for no limit
+ErrorLimits = namedtuple('ErrorLimits', 'per_file per_line')
+DEFAULT_ERROR_LIMITS = ErrorLimits(1000, 100)
+
+# the symbol names by id: terminals, whose ids are the token kinds, then nonterminals, then actions
+names = []
+# indexed by symbol id, None for terminals and actions: the follow set of a nonterminal as a set of kinds, and its
+# predict row, which maps each kind to the predicted path pushed in reverse or to None
+follow = []
+predict = []
+# the kinds panic mode stops skipping at for each nonterminal: the ones it predicts on and its follow set
+sync = []
+first_nonterminal = 0
+first_action = 0
+
+
+class ParseStopped(Exception):
+    pass
+
+
+class UnexpectedEOF(ParseStopped):
+    pass
+
+
+class TooManyErrors(ParseStopped):
+    pass
 
-EPSILON_SYMBOL = 'ε'
-END_SYMBOL = '$'
-
-root = AnyNode(id="Program")
-syntax_errors = defaultdict(list)
-parse_tree = list()
-
-follow = follow_sets = {'Program': ['$'],
-                        'DeclarationList': ['$', 'ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'while', 'return', '+',
-                                            '-'],
-                        'Declaration': ['$', 'ID', ';', 'NUM', '(', 'int', 'void', '{', '}', 'break', 'if', 'while',
-                                        'return', '+', '-'], 'DeclarationInitial': [';', '[', '(', ')', ','],
-                        'DeclarationPrime': ['$', 'ID', ';', 'NUM', '(', 'int', 'void', '{', '}', 'break', 'if',
-                                             'while', 'return', '+', '-'],
-                        'VarDeclarationPrime': ['$', 'ID', ';', 'NUM', '(', 'int', 'void', '{', '}', 'break', 'if',
-                                                'while', 'return', '+', '-'],
-                        'FunDeclarationPrime': ['$', 'ID', ';', 'NUM', '(', 'int', 'void', '{', '}', 'break', 'if',
-                                                'while', 'return', '+', '-'], 'TypeSpecifier': ['ID'], 'Params': [')'],
-                        'ParamList': [')'], 'Param': [')', ','], 'ParamPrime': [')', ','],
-                        'CompoundStmt': ['$', 'ID', ';', 'NUM', '(', 'int', 'void', '{', '}', 'break', 'if', 'endif',
-                                         'else', 'while', 'return', '+', '-'], 'StatementList': ['}'],
-                        'Statement': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while',
-                                      'return', '+', '-'],
-                        'ExpressionStmt': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while',
-                                           'return', '+', '-'],
-                        'SelectionStmt': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while',
-                                          'return', '+', '-'],
-                        'ElseStmt': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while', 'return',
-                                     '+', '-'],
-                        'IterationStmt': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while',
-                                          'return', '+', '-'],
-                        'ReturnStmt': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while',
-                                       'return', '+', '-'],
-                        'ReturnStmtPrime': ['ID', ';', 'NUM', '(', '{', '}', 'break', 'if', 'endif', 'else', 'while',
-                                            'return', '+', '-'], 'Expression': [';', ']', ')', ','],
-                        'B': [';', ']', ')', ','], 'H': [';', ']', ')', ','],
-                        'SimpleExpressionZegond': [';', ']', ')', ','], 'SimpleExpressionPrime': [';', ']', ')', ','],
-                        'C': [';', ']', ')', ','], 'Relop': ['ID', 'NUM', '(', '+', '-'],
-                        'AdditiveExpression': [';', ']', ')', ','],
-                        'AdditiveExpressionPrime': [';', ']', ')', ',', '<', '=='],
-                        'AdditiveExpressionZegond': [';', ']', ')', ',', '<', '=='],
-                        'D': [';', ']', ')', ',', '<', '=='], 'Addop': ['ID', 'NUM', '(', '+', '-'],
-                        'Term': [';', ']', ')', ',', '<', '==', '+', '-'],
-                        'TermPrime': [';', ']', ')', ',', '<', '==', '+', '-'],
-                        'TermZegond': [';', ']', ')', ',', '<', '==', '+', '-'],
-                        'G': [';', ']', ')', ',', '<', '==', '+', '-'], 'Mulop': ['ID', 'NUM', '(', '+', '-'],
-                        'SignedFactor': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'SignedFactorPrime': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'SignedFactorZegond': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'Factor': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'VarCallPrime': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'VarPrime': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'FactorPrime': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'],
-                        'FactorZegond': [';', ']', ')', ',', '<', '==', '+', '-', '*', '/'], 'Args': [')'],
-                        'ArgList': [')'], 'ArgListPrime': [')']}
-
-predict = {}
-rules = 88 * [0]
-
-
-def save_syntax_errors():
-    del syntax_errors[1]
-    with open('syntax_errors.txt', 'w') as f:
-        if syntax_errors:
-            f.write('\n'.join(['#' + f'{line_no}' + ' : syntax error, ' + f'{error}'
-                               for line_no, errors in syntax_errors.items()
-                               for error in errors]))
+
+def save_syntax_errors(syntax_errors, path='syntax_errors.txt'):
+    # errors reported on the first line are dropped
+    lines = ['#' + f'{line_no}' + ' : syntax error, ' + f'{error}'
+             for line_no, errors in syntax_errors.items() if line_no != 1
+             for error in errors]
+    with open(path, 'w') as f:
+        if lines:
+            f.write('\n'.join(lines))
         else:
             f.write('There is no syntax error.')
 
 
-def save_parse_tree():
-    with open('parse_tree.txt', 'w') as f:
-        f.write(RenderTree(root).by_attr('id'))
+def save_parse_tree(tree, path='parse_tree.txt'):
+    with open(path, 'w') as f:
+        tree.write(f)
 
 
 def init_first_follow():
-    with open("resource/grammar_rules.txt") as f1, open("resource/predict.txt") as f2:
-        for x, y in zip(f1, f2):
-            elements = x.strip().split('    ', 1)
-            rules[int(elements[0])] = elements[1]
-            rule = elements[1].split('⟶', 1)
-            left = rule[0]
-            right = rule[1]
-            if left not in predict:
-                predict[left] = {}
-            y = y.strip().split(', ')
-            for first_for_rule in y:
-                predict[left][first_for_rule] = right.split(' ')
+    # the tables are loaded once and shared read-only by every parser in the process
+    global first_nonterminal, first_action
+    if predict:
+        return
+    tables = load_tables()
+    names.extend(tables.TERMINALS + tables.NONTERMINALS + tables.ACTIONS)
+    terminal_count = len(tables.TERMINALS)
+    first_nonterminal = terminal_count
+    first_action = terminal_count + len(tables.NONTERMINALS)
+    follow.extend([None] * len(names))
+    predict.extend([None] * len(names))
+    sync.extend([None] * len(names))
+    for nt_id in range(len(tables.NONTERMINALS)):
+        symbol = first_nonterminal + nt_id
+        follow[symbol] = frozenset(tables.FOLLOW[nt_id])
+        # kinds the grammar does not use, such as ':', predict nothing
+        row = predict[symbol] = [None] * len(KIND_NAMES)
+        for terminal, rule_id in enumerate(tables.PARSE_TABLE[nt_id * terminal_count:(nt_id + 1) * terminal_count]):
+            if rule_id != NO_RULE:
+                path = tables.RULES[rule_id][1]
+                if all(next >= first_action for next in path):
+                    # the actions of an epsilon rule run right after it is predicted
+                    row[terminal] = (EPSILON,) + path
+                else:
+                    row[terminal] = path[::-1]
+        sync[symbol] = follow[symbol] | {kind for kind, path in enumerate(row) if path is not None}
+
+
+class ParseListener:
+    """
+    Receives a parse as a stream of events instead of a tree. Tokens are given as their kind and lexeme; the end
+    of the input is the END_KIND token. Subclasses override the events they need.
+    """
+
+    def enter(self, nonterminal):
+        pass
+
+    def token(self, kind, lexeme):
+        pass
+
+    def epsilon(self):
+        pass
+
+    def exit(self, nonterminal):
+        pass
+
+    def action(self, name, line_number, lexeme):
+        """Called for an action symbol of the grammar, with the lexeme of the lookahead token at that point."""
+        pass
+
+    def error(self, line_number, message):
+        pass
+
 
+class ListenerGroup(ParseListener):
+    """Forwards every event to each of its listeners in order."""
 
-def finish():
-    save_parse_tree()
-    save_syntax_errors()
-    exit()
+    def __init__(self, *listeners):
+        self.listeners = listeners
 
+    def enter(self, nonterminal):
+        for listener in self.listeners:
+            listener.enter(nonterminal)
 
-def is_terminal(a):
-    if a in follow.keys():
-        return False
-    return True
+    def token(self, kind, lexeme):
+        for listener in self.listeners:
+            listener.token(kind, lexeme)
 
+    def epsilon(self):
+        for listener in self.listeners:
+            listener.epsilon()
 
-def print_token(t):
-    if type(t) is str:
-        return t
-    return '(' + t[0] + ', ' + t[1] + ')'
+    def exit(self, nonterminal):
+        for listener in self.listeners:
+            listener.exit(nonterminal)
+
+    def action(self, name, line_number, lexeme):
+        for listener in self.listeners:
+            listener.action(name, line_number, lexeme)
+
+    def error(self, line_number, message):
+        for listener in self.listeners:
+            listener.error(line_number, message)
+
+
+def token_label_text(label):
+    kind, lexeme = label
+    return token_text(kind, lexeme)
+
+
+class ParseTreeBuilder(ParseListener):
+    """Builds the ParseTree that parse_tree.txt is written from."""
+
+    def __init__(self):
+        self.tree = None
+        self.open_nodes = []
+
+    def enter(self, nonterminal):
+        if self.tree is None:
+            self.tree = ParseTree(nonterminal, token_label_text)
+            self.open_nodes.append(self.tree.root)
+        else:
+            self.open_nodes.append(self.tree.add(nonterminal))
+
+    def token(self, kind, lexeme):
+        # formatted only when the tree is written
+        self.tree.add((kind, lexeme), self.open_nodes[-1])
+
+    def epsilon(self):
+        self.tree.add("epsilon", self.open_nodes[-1])
+
+    def exit(self, nonterminal):
+        node = self.open_nodes.pop()
+        if self.open_nodes:
+            self.tree.attach(node, self.open_nodes[-1])
 
 
 class Parser:
-    def __init__(self, p_scanner):
-        self.token = None
+    def __init__(self, p_scanner, session, listener):
+        self.session = session
+        self.syntax_errors = session.syntax_errors
+        self.error_limits = session.error_limits
+        self.error_count = 0
+        self.listener = listener
+        self.lexeme = None
         self.parse_scanner = p_scanner
         self.parse_scanner.init_input()
         self.line_number = 0
-        self.LA = str()
+        # the most entries the parse stack held
+        self.peak_depth = 0
+        # the kind of the lookahead token
+        self.LA = None
 
     def parse_program(self):
-        self.update_la(root)
-        self.dfa(root)
-        AnyNode(id=END_SYMBOL, parent=root)
-        finish()
-
-    def update_la(self, nt_node):
-        if self.LA == END_SYMBOL:
-            nt_node.parent = None
-            syntax_errors[self.line_number].append('Unexpected EOF')
-            finish()
-        self.token = self.parse_scanner.get_next_token()
-        if type(self.token) is str:
-            # EOF
-            self.LA = self.token
-        else:
-            self.line_number = self.token[0]
-            self.token = self.token[1]
-            self.LA = scanner.get_type(self.token[1])
-
-    def dfa(self, nt_node):
-        state = nt_node.id
-        if self.LA in predict[state]:
-            path = predict[state][self.LA]
-            if len(path) == 1 and path[0] == EPSILON_SYMBOL:
-                # epsilon
-                AnyNode(id="epsilon", parent=nt_node)
+        self.listener.enter("Program")
+        try:
+            self.update_la()
+            self.dfa(first_nonterminal)
+            self.listener.token(END_KIND, END_SYMBOL)
+        except ParseStopped:
+            pass
+        self.listener.exit("Program")
+
+    def report_error(self, message):
+        """
+        Records a syntax error. Past the per line limit the errors of the line are dropped after a note, and the
+        first error past the per file limit stops the parse; dropped errors count towards the per file limit too.
+        """
+        errors = self.syntax_errors[self.line_number]
+        per_file, per_line = self.error_limits
+        if per_file is not None and self.error_count >= per_file:
+            errors.append(FILE_LIMIT_MESSAGE)
+            self.listener.error(self.line_number, FILE_LIMIT_MESSAGE)
+            raise TooManyErrors()
+        if per_line is not None and len(errors) >= per_line:
+            if len(errors) > per_line:
+                self.error_count += 1
                 return
-            else:
-                for next in path:
-                    if not is_terminal(next):
-                        next_nt_node = AnyNode(id=next, parent=nt_node)
-                        self.dfa(next_nt_node)
+            message = LINE_LIMIT_MESSAGE
+        errors.append(message)
+        self.error_count += 1
+        self.listener.error(self.line_number, message)
+
+    def update_la(self):
+        if self.LA == END_KIND:
+            self.report_error('Unexpected EOF')
+            raise UnexpectedEOF()
+        line_number, self.LA, self.lexeme = self.parse_scanner.get_next_token()
+        if self.LA != END_KIND:
+            self.line_number = line_number + 1
+
+    def dfa(self, state):
+        """
+        Parses the nonterminal state with an explicit stack instead of recursing, so the Python stack does not grow
+        with nesting depth, statement count or runs of illegal tokens. A nonterminal is entered only once it is
+        predicted, so nonterminals deleted by error recovery produce no events. The listener has already entered
+        state itself and exits it.
+        """
+        listener = self.listener
+        # symbol ids to parse, and ~nonterminal to exit the nonterminal once it is complete
+        stack = []
+        peak_depth = 0
+        is_outermost = True
+        try:
+            while True:
+                while True:
+                    path = predict[state][self.LA]
+                    if path is not None:
+                        if not is_outermost:
+                            listener.enter(names[state])
+                        if path[0] == EPSILON:
+                            listener.epsilon()
+                            for action in path[1:]:
+                                listener.action(names[action], self.line_number, self.lexeme)
+                            if not is_outermost:
+                                listener.exit(names[state])
+                        else:
+                            if not is_outermost:
+                                stack.append(~state)
+                            stack.extend(path)
+                            if len(stack) > peak_depth:
+                                peak_depth = len(stack)
+                        break
+                    # delete the nonterminal
+                    if self.LA in follow[state]:
+                        # sync
+                        self.report_error('missing ' + names[state])
+                        break
+                    # skip the tokens up to the next one the nonterminal predicts on or syncs at
+                    stops = sync[state]
+                    while self.LA not in stops:
+                        if self.LA != END_KIND:
+                            self.report_error('illegal ' + KIND_NAMES[self.LA])
+                        self.update_la()
+                is_outermost = False
+
+                while stack:
+                    next = stack.pop()
+                    if next < 0:
+                        listener.exit(names[~next])
+                    elif next >= first_action:
+                        listener.action(names[next], self.line_number, self.lexeme)
+                    elif next >= first_nonterminal:
+                        state = next
+                        break
                     elif self.LA == next:
-                        AnyNode(id=print_token(self.token), parent=nt_node)
-                        if self.LA != END_SYMBOL:
-                            self.update_la(nt_node)
+                        listener.token(next, self.lexeme)
+                        if self.LA != END_KIND:
+                            self.update_la()
                     else:
-                        syntax_errors[self.line_number].append('missing ' + next)
-        else:
-            # delete nt_node
-            if self.LA in follow[state]:
-                # sync
-                nt_node.parent = None
-                syntax_errors[self.line_number].append('missing ' + state)
-                return
-            else:
-                # empty
-                if self.LA != END_SYMBOL:
-                    syntax_errors[self.line_number].append('illegal ' + self.LA)
-                self.update_la(nt_node)
-                self.dfa(nt_node)
-                return
+                        self.report_error('missing ' + names[next])
+                else:
+                    return
+        except ParseStopped:
+            # the nonterminals still open keep their partial subtrees
+            for next in reversed(stack):
+                if next < 0:
+                    listener.exit(names[~next])
+            raise
+        finally:
+            self.peak_depth = max(self.peak_depth, peak_depth)
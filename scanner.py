@@ -1,8 +1,17 @@
+import codecs
+import io
+import itertools
+import locale
+import mmap
+import os
+import re
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 
-symbol_table = dict()
-lexical_errors = defaultdict(list)
-tokens = defaultdict(list)
+from grammar import END_SYMBOL, load_tables
+from symbols import SymbolTable
 
 
 class Config:
@@ -11,6 +20,10 @@ class Config:
     WHITESPACES = [' ', '\n', '\r', '\t', '\v', '\f']
 
 
+KEYWORD_SET = frozenset(Config.KEYWORDS)
+SYMBOL_SET = frozenset(Config.SYMBOLS)
+
+
 class TokenType:
     SYMBOL = 'SYMBOL'
     NUM = 'NUM'
@@ -30,6 +43,75 @@ class Token:
         self.value = value
 
 
+def build_kind_names(terminals):
+    """
+    Names the token kinds: the terminals of the grammar in parse table order, so a token's kind is its terminal id,
+    then the keywords and symbols the grammar does not use.
+    """
+    return list(terminals) + [name for name in Config.KEYWORDS + Config.SYMBOLS if name not in terminals]
+
+
+KIND_NAMES = build_kind_names(load_tables().TERMINALS)
+END_KIND = KIND_NAMES.index(END_SYMBOL)
+ID_KIND = KIND_NAMES.index(TokenType.ID)
+NUM_KIND = KIND_NAMES.index(TokenType.NUM)
+KEYWORD_KINDS = {keyword: KIND_NAMES.index(keyword) for keyword in Config.KEYWORDS}
+SYMBOL_KINDS = {symbol: KIND_NAMES.index(symbol) for symbol in Config.SYMBOLS}
+# the token type tokens.txt shows for each kind
+KIND_TYPES = [TokenType.KEYWORD if name in KEYWORD_KINDS else TokenType.SYMBOL if name in SYMBOL_KINDS else name
+              for name in KIND_NAMES]
+END_TOKEN = (0, END_KIND, END_SYMBOL)
+
+
+def token_kind(token_type, value):
+    if token_type == TokenType.ID:
+        return ID_KIND
+    if token_type == TokenType.NUM:
+        return NUM_KIND
+    return KEYWORD_KINDS.get(value) if token_type == TokenType.KEYWORD else SYMBOL_KINDS[value]
+
+
+def token_text(kind, lexeme):
+    """The token as tokens.txt and parse_tree.txt show it."""
+    if kind == END_KIND:
+        return END_SYMBOL
+    return '(' + KIND_TYPES[kind] + ', ' + lexeme + ')'
+
+
+class TokenBuffer:
+    """
+    The tokens of a scan in order, as parallel arrays of their 0-based line numbers and kinds and a list of their
+    lexemes; identifier and keyword lexemes are the interned names of the symbol table. Iterating yields
+    (line number, kind, lexeme) tuples.
+    """
+
+    def __init__(self):
+        self.lines = array('i')
+        self.kinds = array('B')
+        self.lexemes = []
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        return zip(self.lines, self.kinds, self.lexemes)
+
+    def append(self, line_number, kind, lexeme):
+        self.lines.append(line_number)
+        self.kinds.append(kind)
+        self.lexemes.append(lexeme)
+
+    def extend(self, tokens):
+        self.lines.extend(tokens.lines)
+        self.kinds.extend(tokens.kinds)
+        self.lexemes.extend(tokens.lexemes)
+
+    def by_line(self):
+        """Yields (line number, tokens of the line) for the lines that have tokens."""
+        for line_number, tokens in itertools.groupby(self, itemgetter(0)):
+            yield line_number, list(tokens)
+
+
 def get_token_type(char):
     if char in Config.WHITESPACES:
         return TokenType.WHITESPACE
@@ -48,32 +130,27 @@ def get_token_type(char):
 def get_type(token):
     if token.isdigit():
         return TokenType.NUM
-    elif token in symbol_table['keywords']:
+    elif token in KEYWORD_SET:
         return token
-    elif token in [';', ':', ',', '[', ']', '(', ')', '{', '}', '+', '-', '*', '/', '=', '<', '==']:
+    elif token in SYMBOL_SET:
         return token
     return TokenType.ID
 
 
-def init_symbol_table():
-    symbol_table['keywords'] = Config.KEYWORDS
-    symbol_table['ids'] = []
+def new_symbol_table():
+    return SymbolTable(Config.KEYWORDS)
 
 
 def is_id_or_keyword(name):
-    for name1 in symbol_table["keywords"]:
-        if name == name1:
-            return TokenType.KEYWORD
-    else:
-        return TokenType.ID
+    return TokenType.KEYWORD if name in KEYWORD_SET else TokenType.ID
 
 
 def get_short_comment(comment):
     return comment[:7] + '...' if len(comment) >= 7 else comment
 
 
-def save_errors():
-    with open('lexical_errors.txt', 'w') as f:
+def save_errors(lexical_errors, path='lexical_errors.txt'):
+    with open(path, 'w') as f:
         if lexical_errors:
             for line_num, line_error in lexical_errors.items():
                 f.write(f'{line_num + 1}.' + "\t")
@@ -88,48 +165,53 @@ def save_errors():
             f.write('There is no lexical error.')
 
 
-def save_tokens():
-    with open('tokens.txt', 'w') as f:
+def save_tokens(tokens, path='tokens.txt'):
+    with open(path, 'w') as f:
         f.write('\n'.join(
-            [f'{line_no + 1}.\t' + ' '.join([f'({token.token_type}, {token.value})' for token in line_tkns])
-             for line_no, line_tkns in tokens.items()]))
+            [f'{line_no + 1}.\t' + ' '.join([token_text(kind, lexeme) for _, kind, lexeme in line_tkns])
+             for line_no, line_tkns in tokens.by_line()]))
 
 
-def save_symbol_table():
-    with open('symbol_table.txt', 'w') as f:
+def save_symbol_table(symbol_table, path='symbol_table.txt'):
+    with open(path, 'w') as f:
         f.write('\n'.join(
-            [f'{idx + 1}.\t{symbol}' for idx, symbol in enumerate(symbol_table['keywords'] + symbol_table['ids'])]))
+            [f'{idx + 1}.\t{symbol}' for idx, symbol in enumerate(symbol_table)]))
 
 
 class Scanner:
-    def __init__(self, input_path):
+    def __init__(self, input_path, session):
         self.input_path = input_path
+        self.session = session
+        self.lexical_errors = session.lexical_errors
+        self.tokens = session.tokens
+        self.symbol_table = session.symbol_table
         self.lines = None
         self.line_number = 0
         self.cursor = 0
 
     def scan_next_token(self):
-        if self.eof_reached():
-            return False
-        char = self.get_current_char()
-        token_type = get_token_type(char)
-        if token_type == TokenType.WHITESPACE:
+        while True:
+            if self.eof_reached():
+                return False
+            char = self.get_current_char()
+            token_type = get_token_type(char)
+            if token_type != TokenType.WHITESPACE:
+                break
             if char == '\n':
                 self.line_number += 1
             self.cursor += 1
-            return self.scan_next_token()
-        elif token_type == TokenType.SYMBOL:
+        if token_type == TokenType.SYMBOL:
             flag = 0
 
             if char == '*':
                 if self.cursor < len(self.lines) - 1 \
                         and self.lines[self.cursor + 1] == '/':
                     self.cursor += 2
-                    lexical_errors[self.line_number].append("(" + "*/" + ", Unmatched comment)")
+                    self.lexical_errors[self.line_number].append("(" + "*/" + ", Unmatched comment)")
                     return False
                 elif self.cursor < len(self.lines) - 1 \
                         and get_token_type(self.lines[self.cursor + 1]) == TokenType.INVALID:
-                    lexical_errors[self.line_number].append(
+                    self.lexical_errors[self.line_number].append(
                         "(" + "*" + self.lines[self.cursor + 1] + ", Invalid input)")
                     self.cursor += 1
                     flag = 1
@@ -140,7 +222,7 @@ class Scanner:
                     return Token(self.line_number, TokenType.SYMBOL, '==')
                 elif self.cursor < len(self.lines) - 1 and get_token_type(
                         self.lines[self.cursor + 1]) == TokenType.INVALID:
-                    lexical_errors[self.line_number].append(
+                    self.lexical_errors[self.line_number].append(
                         "(" + "=" + self.lines[self.cursor + 1] + ", Invalid input)")
                     self.cursor += 1
                     flag = 1
@@ -153,31 +235,32 @@ class Scanner:
             number, error = self.is_number()
             if not error:
                 return Token(self.line_number, TokenType.NUM, number)
-            lexical_errors[self.line_number].append("(" + number + ", Invalid number)")
+            self.lexical_errors[self.line_number].append("(" + number + ", Invalid number)")
 
         elif token_type == TokenType.ID_OR_KEYWORD:
             name, error = self.find_id_or_keyword()
             if not error:
-                return Token(self.line_number, is_id_or_keyword(name), name)
-            lexical_errors[self.line_number].append("(" + name + ", Invalid input)")
+                return Token(self.line_number, is_id_or_keyword(name), self.symbol_table.add(name))
+            self.lexical_errors[self.line_number].append("(" + name + ", Invalid input)")
 
         elif token_type == TokenType.COMMENT:
             self.find_comment()
 
         elif token_type == TokenType.INVALID:
-            lexical_errors[self.line_number].append("(" + char + ", Invalid input)")
+            self.lexical_errors[self.line_number].append("(" + char + ", Invalid input)")
             self.cursor += 1
 
     def eof_reached(self):
         return self.cursor >= len(self.lines)
 
     def get_next_token(self):
+        """Returns the next token as (0-based line number, kind, lexeme), END_TOKEN at the end of the input."""
         while True:
             if self.eof_reached():
-                return '$'
+                return END_TOKEN
             token = self.scan_next_token()
             if token:
-                return token.line_number + 1, (token.token_type, token.value)
+                return token.line_number, token_kind(token.token_type, token.value), token.value
 
     def init_input(self):
         with open(self.input_path, 'r') as f:
@@ -191,9 +274,7 @@ class Scanner:
                 break
             token = self.scan_next_token()
             if token:
-                tokens[token.line_number].append(token)
-                if token.token_type == TokenType.ID and token.value not in symbol_table['ids']:
-                    symbol_table['ids'].append(token.value)
+                self.tokens.append(token.line_number, token_kind(token.token_type, token.value), token.value)
 
     def get_current_char(self):
         return self.lines[self.cursor]
@@ -234,25 +315,25 @@ class Scanner:
         beginning_line_number = self.line_number
         lexeme = self.get_current_char()
         if self.cursor + 1 == len(self.lines):
-            lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")  # last char is /
+            self.lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")  # last char is /
             self.cursor += 1
             return
         next_char = self.lines[self.cursor + 1]
         if next_char not in ['*']:
             if get_token_type(next_char) == TokenType.WHITESPACE:
-                lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")
+                self.lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")
                 if next_char == "\n":
                     self.cursor += 1
                 else:
                     self.cursor += 2
             elif get_token_type(next_char) == TokenType.SYMBOL or get_token_type(next_char) == TokenType.NUM:
-                lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")
+                self.lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")
                 self.cursor += 1
             elif get_token_type(next_char) == TokenType.COMMENT:
-                lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")
+                self.lexical_errors[self.line_number].append("(" + lexeme + ", Invalid input)")
                 self.cursor += 1
             else:
-                lexical_errors[self.line_number].append("(" + lexeme + next_char + ", Invalid input)")
+                self.lexical_errors[self.line_number].append("(" + lexeme + next_char + ", Invalid input)")
                 self.cursor += 2
             return
 
@@ -269,7 +350,7 @@ class Scanner:
                         return False
                 else:
                     self.cursor += 1
-                    lexical_errors[beginning_line_number].append(
+                    self.lexical_errors[beginning_line_number].append(
                         "(" + get_short_comment(lexeme) + ", Unclosed comment)")
                     return None, True
             if temp_char == '\n':
@@ -277,3 +358,367 @@ class Scanner:
             lexeme += temp_char
         self.cursor += 1
         return lexeme, False
+
+
+class CharClass:
+    WHITESPACE = 0
+    NEWLINE = 1
+    DIGIT = 2
+    LETTER = 3
+    SYMBOL = 4
+    STAR = 5
+    EQUAL = 6
+    SLASH = 7
+    INVALID = 8
+
+
+class ScanState:
+    START = 0
+    NUM = 1
+    ID = 2
+    STAR = 3
+    EQUAL = 4
+
+
+class ScanAction:
+    SKIP = 0  # consume the char and stay in START
+    SHIFT = 1  # consume the char and move to the next state
+    EMIT = 2  # emit the lexeme before the char without consuming it
+    EMIT_WITH = 3  # consume the char and emit the lexeme including it
+    ERROR = 4  # consume the char and report the lexeme including it
+
+
+class CharClassTable(dict):
+    """Maps code points to CharClass values, usable directly by str.translate."""
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char == '\n':
+            char_class = CharClass.NEWLINE
+        elif char in Config.WHITESPACES:
+            char_class = CharClass.WHITESPACE
+        elif char == '*':
+            char_class = CharClass.STAR
+        elif char == '=':
+            char_class = CharClass.EQUAL
+        elif char == '/':
+            char_class = CharClass.SLASH
+        elif char in Config.SYMBOLS:
+            char_class = CharClass.SYMBOL
+        elif char.isdigit():
+            char_class = CharClass.DIGIT
+        elif char.isalnum():
+            char_class = CharClass.LETTER
+        else:
+            char_class = CharClass.INVALID
+        self[code] = char_class
+        return char_class
+
+
+CHAR_CLASSES = CharClassTable()
+for _code in range(128):
+    CHAR_CLASSES[_code]
+
+
+def build_transition_table():
+    """
+    Returns TRANSITIONS[state][char_class] = (action, next_state, label), where label is the token type
+    for emits and the error message for errors.
+    """
+    delimiters = [CharClass.WHITESPACE, CharClass.NEWLINE, CharClass.SYMBOL, CharClass.STAR, CharClass.EQUAL,
+                  CharClass.SLASH]
+    start = 9 * [None]
+    start[CharClass.WHITESPACE] = (ScanAction.SKIP, ScanState.START, None)
+    start[CharClass.NEWLINE] = (ScanAction.SKIP, ScanState.START, None)
+    start[CharClass.DIGIT] = (ScanAction.SHIFT, ScanState.NUM, None)
+    start[CharClass.LETTER] = (ScanAction.SHIFT, ScanState.ID, None)
+    start[CharClass.SYMBOL] = (ScanAction.EMIT_WITH, ScanState.START, TokenType.SYMBOL)
+    start[CharClass.SLASH] = (ScanAction.EMIT_WITH, ScanState.START, TokenType.SYMBOL)
+    start[CharClass.STAR] = (ScanAction.SHIFT, ScanState.STAR, None)
+    start[CharClass.EQUAL] = (ScanAction.SHIFT, ScanState.EQUAL, None)
+    start[CharClass.INVALID] = (ScanAction.ERROR, ScanState.START, 'Invalid input')
+
+    num = 9 * [(ScanAction.EMIT, ScanState.START, TokenType.NUM)]
+    num[CharClass.DIGIT] = (ScanAction.SHIFT, ScanState.NUM, None)
+    num[CharClass.LETTER] = (ScanAction.ERROR, ScanState.START, 'Invalid number')
+    num[CharClass.INVALID] = (ScanAction.ERROR, ScanState.START, 'Invalid number')
+
+    identifier = 9 * [(ScanAction.ERROR, ScanState.START, 'Invalid input')]
+    identifier[CharClass.DIGIT] = (ScanAction.SHIFT, ScanState.ID, None)
+    identifier[CharClass.LETTER] = (ScanAction.SHIFT, ScanState.ID, None)
+    for char_class in delimiters:
+        identifier[char_class] = (ScanAction.EMIT, ScanState.START, TokenType.ID_OR_KEYWORD)
+
+    star = 9 * [(ScanAction.EMIT, ScanState.START, TokenType.SYMBOL)]
+    star[CharClass.SLASH] = (ScanAction.ERROR, ScanState.START, 'Unmatched comment')
+    star[CharClass.INVALID] = (ScanAction.ERROR, ScanState.START, 'Invalid input')
+
+    equal = 9 * [(ScanAction.EMIT, ScanState.START, TokenType.SYMBOL)]
+    equal[CharClass.EQUAL] = (ScanAction.EMIT_WITH, ScanState.START, TokenType.SYMBOL)
+    equal[CharClass.INVALID] = (ScanAction.ERROR, ScanState.START, 'Invalid input')
+
+    transitions = 5 * [None]
+    transitions[ScanState.START] = start
+    transitions[ScanState.NUM] = num
+    transitions[ScanState.ID] = identifier
+    transitions[ScanState.STAR] = star
+    transitions[ScanState.EQUAL] = equal
+    return transitions
+
+
+def build_self_loops(transitions):
+    """Compiles, for every state, a pattern over char classes matching the run the state loops on."""
+    loops = []
+    for state, row in enumerate(transitions):
+        looping = bytes(char_class for char_class, (action, next_state, _) in enumerate(row)
+                        if action in (ScanAction.SKIP, ScanAction.SHIFT) and next_state == state)
+        loops.append(re.compile(b'[' + re.escape(looping) + b']*') if looping else None)
+    return loops
+
+
+TRANSITIONS = build_transition_table()
+SELF_LOOPS = build_self_loops(TRANSITIONS)
+# token type of the pending lexeme when input ends in each state
+EOF_LABELS = [None, TokenType.NUM, TokenType.ID_OR_KEYWORD, TokenType.SYMBOL, TokenType.SYMBOL]
+NEWLINE_CLASS = bytes([CharClass.NEWLINE])
+CHUNK_SIZE = 1 << 16
+# smallest part of an input ParallelScanner scans in a worker
+PARALLEL_CHUNK_SIZE = 8 << 20
+
+
+class TableScanner(Scanner):
+    """
+    Scanner driven by a precomputed char class table and an explicit transition table.
+    Produces the same tokens and errors as Scanner, emitting lexemes as slices of the input.
+    """
+
+    def __init__(self, input_path, session):
+        super().__init__(input_path, session)
+        self.token_stream = None
+
+    def init_input(self):
+        with open(self.input_path, 'r') as f:
+            self.lines = f.read()
+        self.token_stream = self.scan()
+
+    def scan(self):
+        return self.scan_chunks([self.lines])
+
+    def scan_chunks(self, chunks):
+        """
+        Yields the tokens of the concatenation of chunks as (line number, kind, lexeme). The DFA state and the
+        pending lexeme prefix are carried over chunk boundaries, so chunks may split the input anywhere.
+        """
+        keyword_kinds = KEYWORD_KINDS
+        symbol_kinds = SYMBOL_KINDS
+        # identifiers and keywords are recorded in the symbol table as they are scanned
+        add_name = self.symbol_table.add
+        lexical_errors = self.lexical_errors
+        transitions = TRANSITIONS
+        self_loops = SELF_LOOPS
+        state = ScanState.START
+        pending = ''
+        for text in chunks:
+            classes = text.translate(CHAR_CLASSES).encode('latin-1')
+            length = len(classes)
+            cursor = start = 0
+            while True:
+                loop = self_loops[state]
+                if loop is not None:
+                    end = loop.match(classes, cursor).end()
+                    if state == ScanState.START:
+                        self.line_number += classes.count(NEWLINE_CLASS, cursor, end)
+                    cursor = end
+                if cursor >= length:
+                    break
+                if state == ScanState.START:
+                    start = cursor
+                action, state, label = transitions[state][classes[cursor]]
+                if action == ScanAction.SHIFT:
+                    cursor += 1
+                    continue
+                if action == ScanAction.EMIT_WITH or action == ScanAction.ERROR:
+                    cursor += 1
+                lexeme = text[start:cursor]
+                if pending:
+                    lexeme = pending + lexeme
+                    pending = ''
+                if action == ScanAction.ERROR:
+                    lexical_errors[self.line_number].append('(' + lexeme + ', ' + label + ')')
+                    continue
+                if label == TokenType.ID_OR_KEYWORD:
+                    lexeme = add_name(lexeme)
+                    yield self.line_number, keyword_kinds.get(lexeme, ID_KIND), lexeme
+                elif label == TokenType.SYMBOL:
+                    yield self.line_number, symbol_kinds[lexeme], lexeme
+                else:
+                    yield self.line_number, NUM_KIND, lexeme
+            if state != ScanState.START:
+                pending += text[start:]
+        label = EOF_LABELS[state]
+        if label is not None:
+            if label == TokenType.ID_OR_KEYWORD:
+                pending = add_name(pending)
+                yield self.line_number, keyword_kinds.get(pending, ID_KIND), pending
+            elif label == TokenType.SYMBOL:
+                yield self.line_number, symbol_kinds[pending], pending
+            else:
+                yield self.line_number, NUM_KIND, pending
+
+    def get_next_token(self):
+        return next(self.token_stream, END_TOKEN)
+
+    def scan_tokens(self):
+        self.init_input()
+        append = self.tokens.append
+        for line_number, kind, lexeme in self.token_stream:
+            append(line_number, kind, lexeme)
+
+
+class ReplayScanner:
+    """Feeds a parser the tokens a previous scan stored in the session, without scanning the input again."""
+
+    def __init__(self, session):
+        self.session = session
+        self.token_stream = None
+
+    def init_input(self):
+        self.token_stream = iter(self.session.tokens)
+
+    def get_next_token(self):
+        return next(self.token_stream, END_TOKEN)
+
+
+def read_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Yields text chunks of at most chunk_size characters from a text file, a binary file or an mmap.
+    Bytes are decoded incrementally with the same universal newline handling as open(path, 'r').
+    """
+    decoder = None
+    while True:
+        data = source.read(chunk_size)
+        if isinstance(data, str):
+            if not data:
+                return
+            yield data
+            continue
+        if decoder is None:
+            decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(locale.getpreferredencoding(False))(),
+                                                   translate=True)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
+
+
+class StreamScanner(TableScanner):
+    """
+    TableScanner reading its input in fixed-size chunks, from a path, an open file object or an mmap,
+    so memory stays flat regardless of the input size.
+    """
+
+    def __init__(self, source, session, chunk_size=CHUNK_SIZE, use_mmap=False):
+        super().__init__(source if isinstance(source, str) else None, session)
+        self.source = source
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+
+    def init_input(self):
+        self.token_stream = self.stream_tokens()
+
+    def stream_tokens(self):
+        if not isinstance(self.source, str):
+            yield from self.scan_chunks(read_chunks(self.source, self.chunk_size))
+            return
+        if not self.use_mmap:
+            with open(self.source, 'r') as f:
+                yield from self.scan_chunks(read_chunks(f, self.chunk_size))
+            return
+        with open(self.source, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from self.scan_chunks(read_chunks(mapped, self.chunk_size))
+
+
+class ScanResult:
+    """Holds what a scan produces when a scanner runs outside of a compilation session."""
+
+    def __init__(self):
+        self.tokens = TokenBuffer()
+        self.lexical_errors = defaultdict(list)
+        self.symbol_table = new_symbol_table()
+
+
+def split_at_lines(path, parts):
+    """
+    Splits a file into about parts byte ranges that start at line starts. Returns (start, end, first line) for each
+    range, counting lines like open(path, 'r') does.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            bounds = [0]
+            for part in range(1, parts):
+                newline = mapped.find(b'\n', max(bounds[-1], size * part // parts))
+                if newline == -1:
+                    break
+                bounds.append(newline + 1)
+            if bounds[-1] < size:
+                bounds.append(size)
+            ranges = []
+            line_number = 0
+            for start, end in zip(bounds, bounds[1:]):
+                ranges.append((start, end, line_number))
+                data = mapped[start:end]
+                line_number += data.count(b'\n') + data.count(b'\r') - data.count(b'\r\n')
+            return ranges
+
+
+def scan_range(job):
+    """Scans the bytes [start, end) of a file, which start on line first_line; runs in ParallelScanner's workers."""
+    path, start, end, first_line = job
+    result = ScanResult()
+    scanner = TableScanner(path, result)
+    scanner.line_number = first_line
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = io.BytesIO(f.read(end - start))
+    append = result.tokens.append
+    for line_number, kind, lexeme in scanner.scan_chunks(read_chunks(data)):
+        append(line_number, kind, lexeme)
+    return result.tokens, dict(result.lexical_errors), result.symbol_table.ids()
+
+
+class ParallelScanner(TableScanner):
+    """
+    TableScanner that splits a large input at line starts and scans the parts in a process pool. Every token ends
+    at a newline and the scanner is back in its start state after it, so the parts scan independently. They are
+    merged in order, each part's new names going into the symbol table after those of the parts before it, so the
+    outputs equal a sequential scan's. Inputs smaller than two parts, a single worker and parsing while scanning
+    scan sequentially.
+    """
+
+    def __init__(self, input_path, session, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+        super().__init__(input_path, session)
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+
+    def scan_tokens(self):
+        parts = min(os.path.getsize(self.input_path) // self.chunk_size, 4 * self.workers)
+        if parts < 2 or self.workers < 2:
+            super().scan_tokens()
+            return
+        jobs = [(self.input_path, start, end, first_line)
+                for start, end, first_line in split_at_lines(self.input_path, parts)]
+        add_name = self.symbol_table.add
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+            for tokens, lexical_errors, names in executor.map(scan_range, jobs):
+                for name in names:
+                    add_name(name)
+                self.tokens.extend(tokens)
+                for line_number, errors in lexical_errors.items():
+                    self.lexical_errors[line_number].extend(errors)
@@ -0,0 +1,133 @@
+import os
+from collections import defaultdict
+
+from codegen import CodeGenerator, save_code, save_semantic_errors
+from optimizer import PASSES, Program, optimize
+from parser import (DEFAULT_ERROR_LIMITS, ListenerGroup, ParseTreeBuilder, Parser, init_first_follow, save_parse_tree,
+                    save_syntax_errors)
+from scanner import (ReplayScanner, TableScanner, TokenBuffer, new_symbol_table, save_errors, save_symbol_table,
+                     save_tokens)
+from stats import Stats
+
+
+OUTPUT_FILES = ['tokens.txt', 'lexical_errors.txt', 'symbol_table.txt', 'parse_tree.txt', 'syntax_errors.txt',
+                'output.txt', 'semantic_errors.txt']
+
+
+class CompilationSession:
+    """
+    Owns all the state of compiling one input, so any number of sessions can run back to back in one process.
+    The grammar tables are loaded once and shared read-only between sessions. error_limits caps the syntax errors
+    the parser records, and stats collects the time each phase takes and what it produced.
+    """
+
+    def __init__(self, input_path, scanner_class=TableScanner, error_limits=DEFAULT_ERROR_LIMITS, stats=None):
+        self.stats = stats or Stats()
+        with self.stats.phase('tables'):
+            init_first_follow()
+        self.input_path = input_path
+        self.scanner_class = scanner_class
+        self.error_limits = error_limits
+        self.symbol_table = new_symbol_table()
+        self.tokens = TokenBuffer()
+        self.lexical_errors = defaultdict(list)
+        self.syntax_errors = defaultdict(list)
+        self.semantic_errors = defaultdict(list)
+        self.tree = None
+        self.code = None
+        self.optimization_report = None
+        self.frames = None
+        self.scanned = False
+        self.generated = False
+
+    def scan(self):
+        with self.stats.phase('scan'):
+            self.scanner_class(self.input_path, self).scan_tokens()
+        self.scanned = True
+        self.stats.count('tokens', len(self.tokens))
+        return self.tokens
+
+    def parse(self, listener=None):
+        """
+        Parses the scanned tokens, or scans while parsing when scan() was not called. Without a listener the
+        parse tree is built into self.tree and returned, otherwise the listener receives the parse as events
+        and no tree is built.
+        """
+        p_scanner = ReplayScanner(self) if self.scanned else self.scanner_class(self.input_path, self)
+        builder = ParseTreeBuilder() if listener is None else None
+        parser = Parser(p_scanner, self, listener or builder)
+        # includes generating code when the listener is a code generator
+        with self.stats.phase('parse'):
+            parser.parse_program()
+        self.stats.peak('peak_parse_depth', parser.peak_depth)
+        if builder is None:
+            return None
+        self.tree = builder.tree
+        self.stats.count('tree_nodes', len(self.tree))
+        return self.tree
+
+    def generate(self, build_tree=True, passes=PASSES):
+        """
+        Parses with the code generator attached, in the same pass, and keeps the code, optimized by the given
+        optimizer passes, in self.code unless the input has errors. The parse tree is built alongside unless
+        build_tree is False.
+        """
+        generator = CodeGenerator(self)
+        if build_tree:
+            builder = ParseTreeBuilder()
+            self.parse(ListenerGroup(builder, generator))
+            self.tree = builder.tree
+            self.stats.count('tree_nodes', len(self.tree))
+        else:
+            self.parse(generator)
+        self.generated = True
+        # syntax errors on the first line are not counted, but they still stop the generator
+        if not (self.lexical_error_count() or generator.stopped or self.semantic_error_count()):
+            program = Program(generator.code, generator.temporaries, generator.return_sites)
+            with self.stats.phase('optimize'):
+                self.optimization_report = optimize(program, passes)
+            self.code = program.code
+            self.stats.count('instructions', len(self.code))
+            self.frames = generator.frame_report()
+        return self.code
+
+    def compile(self, build_tree=True, passes=PASSES):
+        self.scan()
+        self.generate(build_tree, passes)
+        return self
+
+    def lexical_error_count(self):
+        return sum(len(errors) for errors in self.lexical_errors.values())
+
+    def syntax_error_count(self):
+        # mirrors save_syntax_errors, which drops the errors of the first line
+        return sum(len(errors) for line_no, errors in self.syntax_errors.items() if line_no != 1)
+
+    def semantic_error_count(self):
+        return sum(len(errors) for errors in self.semantic_errors.values())
+
+    def save(self, output_dir='.'):
+        """Writes the outputs of the phases that ran and returns their file names."""
+        with self.stats.phase('write'):
+            saved = self.write_outputs(output_dir)
+        self.stats.count('output_bytes', sum(os.path.getsize(os.path.join(output_dir, name)) for name in saved))
+        return saved
+
+    def write_outputs(self, output_dir):
+        saved = []
+        if self.scanned:
+            save_tokens(self.tokens, os.path.join(output_dir, 'tokens.txt'))
+            save_errors(self.lexical_errors, os.path.join(output_dir, 'lexical_errors.txt'))
+            save_symbol_table(self.symbol_table, os.path.join(output_dir, 'symbol_table.txt'))
+            saved += ['tokens.txt', 'lexical_errors.txt', 'symbol_table.txt']
+        if self.tree is not None:
+            save_parse_tree(self.tree, os.path.join(output_dir, 'parse_tree.txt'))
+            saved.append('parse_tree.txt')
+        if self.tree is not None or self.generated:
+            save_syntax_errors(self.syntax_errors, os.path.join(output_dir, 'syntax_errors.txt'))
+            saved.append('syntax_errors.txt')
+        if self.generated:
+            save_code(self.code, os.path.join(output_dir, 'output.txt'))
+            save_semantic_errors(self.semantic_errors, os.path.join(output_dir, 'semantic_errors.txt'))
+            saved += ['output.txt', 'semantic_errors.txt']
+        return saved
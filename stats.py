@@ -0,0 +1,99 @@
+"""
+Instrumentation of the compiler phases: wall and CPU time per phase, counters such as the tokens scanned and the
+parse tree nodes created, and, when tracing memory, the peak memory tracemalloc traced in each phase.
+compiler.py writes them as JSON with --stats.
+"""
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# counters merged by taking the largest value instead of the sum
+PEAK_COUNTERS = ('peak_parse_depth',)
+
+
+class Stats:
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        # phase name -> {'wall': seconds, 'cpu': seconds[, 'peak_memory': bytes]}
+        self.phases = {}
+        self.counters = {}
+        # the peak memory so far of each open phase, innermost last
+        self.open_peaks = []
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the body as the named phase; repeated phases add up. The peak memory of a phase is measured from its
+        start, and counts towards the peak of the phase it is nested in.
+        """
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if self.open_peaks:
+                self.open_peaks[-1] = max(self.open_peaks[-1], tracemalloc.get_traced_memory()[1])
+            self.open_peaks.append(0)
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            record = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            record['wall'] += time.perf_counter() - wall
+            record['cpu'] += time.process_time() - cpu
+            if self.trace_memory:
+                peak = max(self.open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self.open_peaks:
+                    self.open_peaks[-1] = max(self.open_peaks[-1], peak)
+                record['peak_memory'] = max(record.get('peak_memory', 0), peak)
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name, value):
+        self.counters[name] = max(self.counters.get(name, 0), value)
+
+    def report(self):
+        """The phases and counters as a JSON-serializable dict, with the scanning rate when tokens were scanned."""
+        report = {'phases': {name: dict(record) for name, record in self.phases.items()},
+                  'counters': dict(self.counters)}
+        scan = self.phases.get('scan')
+        if scan and scan['wall'] and 'tokens' in self.counters:
+            report['tokens_per_second'] = self.counters['tokens'] / scan['wall']
+        return report
+
+
+def merge_reports(reports):
+    """Aggregates the reports of a batch: times and counters add up, peaks keep the largest value."""
+    phases = {}
+    counters = {}
+    for report in reports:
+        for name, record in report['phases'].items():
+            total = phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            total['wall'] += record['wall']
+            total['cpu'] += record['cpu']
+            if 'peak_memory' in record:
+                total['peak_memory'] = max(total.get('peak_memory', 0), record['peak_memory'])
+        for name, value in report['counters'].items():
+            if name in PEAK_COUNTERS:
+                counters[name] = max(counters.get(name, 0), value)
+            else:
+                counters[name] = counters.get(name, 0) + value
+    merged = {'phases': phases, 'counters': counters}
+    scan = phases.get('scan')
+    if scan and scan['wall'] and 'tokens' in counters:
+        merged['tokens_per_second'] = counters['tokens'] / scan['wall']
+    return merged
+
+
+@contextmanager
+def profiled(path):
+    """Runs the body under cProfile and writes the pstats file to path."""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
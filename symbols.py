@@ -0,0 +1,81 @@
+"""
+The symbol table a compilation session shares between its phases. The scanner records every keyword and
+identifier, interned, in order of first appearance, which is the order of symbol_table.txt; the semantic phase
+declares symbols in nested scopes on the same table. Name and keyword lookups and scoped lookups are dict based.
+"""
+import sys
+
+
+class SymbolKind:
+    VARIABLE = 'variable'
+    ARRAY = 'array'
+    PARAMETER = 'parameter'
+    ARRAY_PARAMETER = 'array parameter'
+    FUNCTION = 'function'
+
+
+class Symbol:
+    """A declared name; type is 'int', 'void' or 'array' and address is its first cell, None for functions."""
+
+    def __init__(self, name, kind, type, address=None):
+        self.name = name
+        self.kind = kind
+        self.type = type
+        self.address = address
+
+
+class SymbolTable:
+    def __init__(self, keywords=()):
+        self.keywords = frozenset(keywords)
+        # interned names by name; the keys keep their insertion order
+        self.names = {}
+        for keyword in keywords:
+            self.add(keyword)
+        # the declarations of each name visible in the current scope, innermost last
+        self.bindings = {}
+        # the names declared in each open scope
+        self.scopes = []
+
+    def add(self, name):
+        """Records name if it is new and returns its interned copy."""
+        interned = self.names.get(name)
+        if interned is None:
+            interned = self.names[name] = sys.intern(name)
+        return interned
+
+    def is_keyword(self, name):
+        return name in self.keywords
+
+    def ids(self):
+        return [name for name in self.names if name not in self.keywords]
+
+    def __iter__(self):
+        """The keywords, then the identifiers in order of first appearance."""
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def enter_scope(self):
+        self.scopes.append([])
+
+    def exit_scope(self):
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            declarations = bindings[name]
+            declarations.pop()
+            if not declarations:
+                del bindings[name]
+
+    def declare(self, symbol):
+        """
+        Declares symbol in the innermost scope, hiding the declarations of its name in the outer ones. Declaring
+        does not record the name, so built-in names stay out of symbol_table.txt.
+        """
+        self.bindings.setdefault(symbol.name, []).append(symbol)
+        self.scopes[-1].append(symbol.name)
+        return symbol
+
+    def lookup(self, name):
+        declarations = self.bindings.get(name)
+        return declarations[-1] if declarations else None
@@ -0,0 +1,32 @@
+import io
+import json
+import unittest
+
+from daemon import Daemon
+
+PROGRAM = 'int main(void) {\n    int x;\n    x = 1;\n}\n'
+
+
+def serve(*requests):
+    """Runs the requests through a new daemon and returns its responses."""
+    responses = io.StringIO()
+    Daemon().serve(io.StringIO(''.join(json.dumps(request) + '\n' for request in requests)), responses)
+    return [json.loads(line) for line in responses.getvalue().splitlines()]
+
+
+class MalformedRequestTest(unittest.TestCase):
+    def test_text_that_is_not_a_string_fails_only_its_request(self):
+        responses = serve({'id': 1, 'command': 'open', 'path': 'input.txt', 'text': PROGRAM},
+                          {'id': 2, 'command': 'edit', 'path': 'input.txt', 'line': 3, 'remove': 1, 'text': 5},
+                          {'id': 3, 'command': 'open', 'path': 'other.txt', 'text': ['x = 1;\n']},
+                          {'id': 4, 'command': 'update', 'path': 'input.txt', 'text': None},
+                          {'id': 5, 'command': 'edit', 'path': 'input.txt', 'line': 3, 'remove': 1,
+                           'text': '    x = 2;\n'})
+        self.assertEqual([response['id'] for response in responses], [1, 2, 3, 4, 5])
+        self.assertEqual([response['ok'] for response in responses], [True, False, False, False, True])
+        self.assertTrue(all(response['error'].startswith('ValueError') for response in responses[1:4]))
+        self.assertEqual(responses[4]['relexed_lines'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
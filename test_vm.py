@@ -2,6 +2,12 @@
 You can run vm on your compiler output to run the intermediate generated code.
 > python3 test_vm.py [path to your output file]
 """
+import argparse
+import collections
+import contextlib
+import io
+import json
+import struct
 import sys
 import re
 
@@ -10,8 +16,8 @@ COMMAND_PATTERN = re.compile(
 
 
 class Context:
-    def __init__(self, output_file, error_file):
-        self.memory = dict()
+    def __init__(self, output_file, error_file, memory=None):
+        self.memory = dict() if memory is None else memory
         self.pc = 0
         self.output_file = output_file
         self.error_file = error_file
@@ -133,6 +139,742 @@ def __execute(instruction: str, context: Context):
         raise Exception('Invalid Command', command)
 
 
+OP_ADD, OP_AND, OP_ASSIGN, OP_EQ, OP_JPF, OP_JP, OP_LT, OP_MULT, OP_DIV, OP_NOT, OP_PRINT, OP_SUB, OP_LEGACY = range(13)
+OPCODES = {'ADD': OP_ADD, 'AND': OP_AND, 'ASSIGN': OP_ASSIGN, 'EQ': OP_EQ, 'JPF': OP_JPF, 'JP': OP_JP, 'LT': OP_LT,
+           'MULT': OP_MULT, 'DIV': OP_DIV, 'NOT': OP_NOT, 'PRINT': OP_PRINT, 'SUB': OP_SUB}
+OPERAND_COUNTS = {OP_ADD: 3, OP_AND: 3, OP_ASSIGN: 2, OP_EQ: 3, OP_JPF: 2, OP_JP: 1, OP_LT: 3, OP_MULT: 3, OP_DIV: 3,
+                  OP_NOT: 2, OP_PRINT: 1, OP_SUB: 3}
+# index of the operand that is written to, or jumped to
+DEST_OPERANDS = {OP_ADD: 2, OP_AND: 2, OP_ASSIGN: 1, OP_EQ: 2, OP_JPF: 1, OP_JP: 0, OP_LT: 2, OP_MULT: 2, OP_DIV: 2,
+                 OP_NOT: 1, OP_PRINT: None, OP_SUB: 2}
+OPCODE_NAMES = {**{opcode: name for name, opcode in OPCODES.items()}, OP_LEGACY: 'LEGACY'}
+IMMEDIATE, DIRECT, INDIRECT = range(3)
+
+
+def decode(instructions: list[str]):
+    """
+    Decodes the program once into records (opcode, text, mode0, value0, mode1, value1, mode2, value2).
+    Instructions the fast path can not represent exactly become OP_LEGACY records, which are executed by the
+    reference interpreter so that they fail, or succeed, exactly as before.
+    """
+    program = []
+    for instruction in instructions:
+        if instruction.isspace():
+            continue
+        program.append(decode_instruction(instruction))
+    return program
+
+
+def decode_instruction(instruction: str):
+    legacy = (OP_LEGACY, instruction, DIRECT, 0, DIRECT, 0, DIRECT, 0)
+    match = re.match(COMMAND_PATTERN, instruction)
+    if not match or match['command'].upper() not in OPCODES:
+        return legacy
+    opcode = OPCODES[match['command'].upper()]
+    params = [s.strip() for s in match['params'].split(',')[1:]]
+    params = [p for p in params if p and not p.isspace()]
+    if len(params) < OPERAND_COUNTS[opcode]:
+        return legacy
+    operands = []
+    for param in params[:OPERAND_COUNTS[opcode]]:
+        try:
+            value = int(param) if param[0].isdigit() else int(param[1:])
+        except ValueError:
+            return legacy
+        operands += [IMMEDIATE if param.startswith('#') else INDIRECT if param.startswith('@') else DIRECT, value]
+    operands += (6 - len(operands)) * [0]
+    return (opcode, instruction, *operands)
+
+
+class Memory:
+    """
+    VM memory backed by a list of cells, growing on demand up to dense_limit, with None marking uninitialized
+    cells. Addresses outside the dense region are kept in a dict. Supports the dict operations the reference
+    interpreter uses, and prints like the dict it replaces, in first-write order.
+    """
+
+    def __init__(self, size: int = 4096, dense_limit: int = 1 << 20):
+        self.cells = size * [None]
+        self.dense_limit = dense_limit
+        self.sparse = dict()
+        self.order = []
+
+    def read(self, address: int):
+        if address >= 0:
+            try:
+                value = self.cells[address]
+            except IndexError:
+                value = self.sparse.get(address)
+        else:
+            value = self.sparse.get(address)
+        if value is None:
+            raise Exception('Invalid access to memory', address)
+        return value
+
+    def write(self, address: int, value):
+        cells = self.cells
+        if 0 <= address < len(cells):
+            if cells[address] is None:
+                self.order.append(address)
+            cells[address] = value
+        elif 0 <= address < self.dense_limit:
+            # extended in place, so references to cells stay valid
+            cells.extend((min(max(address + 1, 2 * len(cells)), self.dense_limit) - len(cells)) * [None])
+            self.order.append(address)
+            cells[address] = value
+        else:
+            if address not in self.sparse:
+                self.order.append(address)
+            self.sparse[address] = value
+
+    def fetch(self, mode: int, value: int):
+        """Reads an operand in the given addressing mode."""
+        if mode == IMMEDIATE:
+            return value
+        if mode == INDIRECT:
+            value = self.read(value)
+        if value >= 0:
+            try:
+                result = self.cells[value]
+            except IndexError:
+                result = self.sparse.get(value)
+        else:
+            result = self.sparse.get(value)
+        if result is None:
+            raise Exception('Invalid access to memory', value)
+        return result
+
+    def fetch_dest(self, mode: int, value: int):
+        """Resolves the address a destination operand in the given addressing mode refers to."""
+        if mode == INDIRECT:
+            return self.read(value)
+        return value
+
+    def get(self, address: int, default=None):
+        cells = self.cells
+        value = cells[address] if 0 <= address < len(cells) else self.sparse.get(address)
+        return default if value is None else value
+
+    def __contains__(self, address: int):
+        return self.get(address) is not None
+
+    def __getitem__(self, address: int):
+        value = self.get(address)
+        if value is None:
+            raise KeyError(address)
+        return value
+
+    def __setitem__(self, address: int, value):
+        self.write(address, value)
+
+    def __len__(self):
+        return len(self.order)
+
+    def items(self):
+        return [(address, self[address]) for address in self.order]
+
+    def __repr__(self):
+        return '{' + ', '.join(f'{address!r}: {value!r}' for address, value in self.items()) + '}'
+
+    def reserve(self, size: int):
+        """Grows the dense region to at least size cells, all uninitialized."""
+        if size > len(self.cells):
+            self.cells.extend((size - len(self.cells)) * [None])
+
+    def snapshot(self):
+        return MemorySnapshot(self.cells[:], dict(self.sparse))
+
+
+class MemorySnapshot:
+    """A copy of a Memory's cells at one point of execution."""
+
+    def __init__(self, cells: list, sparse: dict):
+        self.cells = cells
+        self.sparse = sparse
+
+    def get(self, address: int):
+        return self.cells[address] if 0 <= address < len(self.cells) else self.sparse.get(address)
+
+    def diff(self, other):
+        """Returns {address: (value here, value in other)} for every cell that differs, None if uninitialized."""
+        changes = {}
+        common = min(len(self.cells), len(other.cells))
+        for address in range(common):
+            if self.cells[address] != other.cells[address]:
+                changes[address] = (self.cells[address], other.cells[address])
+        for address in range(common, max(len(self.cells), len(other.cells))):
+            if self.get(address) is not None or other.get(address) is not None:
+                changes[address] = (self.get(address), other.get(address))
+        for address in self.sparse.keys() | other.sparse.keys():
+            if self.sparse.get(address) != other.sparse.get(address):
+                changes[address] = (self.sparse.get(address), other.sparse.get(address))
+        return changes
+
+
+def make_handlers(on_store=None):
+    """
+    Returns the opcode dispatch table. on_store(address, value) is called after every store; without it the
+    handlers do no tracing work at all.
+    """
+    if on_store is None:
+        def store(memory: Memory, mode: int, value: int, result):
+            memory.write(memory.fetch_dest(mode, value), result)
+    else:
+        def store(memory: Memory, mode: int, value: int, result):
+            address = memory.fetch_dest(mode, value)
+            memory.write(address, result)
+            on_store(address, result)
+
+    def triple_address_handler(operation):
+        def handler(record, context: Context):
+            memory = context.memory
+            result = operation(memory.fetch(record[2], record[3]), memory.fetch(record[4], record[5]))
+            store(memory, record[6], record[7], result)
+
+        return handler
+
+    def execute_assign(record, context: Context):
+        memory = context.memory
+        # Only because of consistency with the legacy tester
+        address = memory.fetch_dest(record[4], record[5])
+        if address not in memory:
+            memory.write(address, 0)
+        store(memory, record[4], record[5], memory.fetch(record[2], record[3]))
+
+    def execute_jpf(record, context: Context):
+        if not context.memory.fetch(record[2], record[3]):
+            context.pc = context.memory.fetch_dest(record[4], record[5])
+
+    def execute_jp(record, context: Context):
+        context.pc = context.memory.fetch_dest(record[2], record[3])
+
+    def execute_not(record, context: Context):
+        store(context.memory, record[4], record[5], not context.memory.fetch(record[2], record[3]))
+
+    def execute_print(record, context: Context):
+        print('PRINT', context.memory.fetch(record[2], record[3]), sep='    ', file=context.output_file)
+
+    handlers = 12 * [None]
+    handlers[OP_ADD] = triple_address_handler(lambda x0, x1: x0 + x1)
+    handlers[OP_AND] = triple_address_handler(lambda x0, x1: x0 & x1)
+    handlers[OP_ASSIGN] = execute_assign
+    handlers[OP_EQ] = triple_address_handler(lambda x0, x1: int(x0 == x1))
+    handlers[OP_JPF] = execute_jpf
+    handlers[OP_JP] = execute_jp
+    handlers[OP_LT] = triple_address_handler(lambda x0, x1: int(x0 < x1))
+    handlers[OP_MULT] = triple_address_handler(lambda x0, x1: x0 * x1)
+    handlers[OP_DIV] = triple_address_handler(lambda x0, x1: x0 // x1)
+    handlers[OP_NOT] = execute_not
+    handlers[OP_PRINT] = execute_print
+    handlers[OP_SUB] = triple_address_handler(lambda x0, x1: x0 - x1)
+    return handlers
+
+
+class NullFile:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+NULL_FILE = NullFile()
+
+
+class Tracer:
+    """
+    Receives the instructions and memory stores executed by run_decoded; the base class ignores them. When the
+    program fails, failed is called first; finish is called after every run, whether or not it failed.
+    """
+    # file the reference interpreter prints the trace of OP_LEGACY instructions to
+    legacy_file = NULL_FILE
+
+    def instruction(self, pc: int, record):
+        pass
+
+    def store(self, address: int, value):
+        pass
+
+    def failed(self):
+        pass
+
+    def finish(self):
+        pass
+
+
+class FullTracer(Tracer):
+    """Prints every instruction and store, in the same format as run."""
+
+    def __init__(self, error_file):
+        self.error_file = self.legacy_file = error_file
+
+    def instruction(self, pc: int, record):
+        print('--->  PC =', pc,
+              'command :', record[1],
+              end='',
+              file=self.error_file)
+
+    def store(self, address: int, value):
+        print(f'--->  memory[{address}] =', value, file=self.error_file)
+
+
+class JumpTracer(Tracer):
+    """Prints only the control transfers, as jumps from the instruction before to the instruction executed next."""
+
+    def __init__(self, error_file):
+        self.error_file = error_file
+        self.last_pc = -1
+
+    def instruction(self, pc: int, record):
+        if pc != self.last_pc + 1:
+            print(f'--->  JUMP {self.last_pc} -> {pc}', file=self.error_file)
+        self.last_pc = pc
+
+
+class SampledTracer(FullTracer):
+    """Prints every Nth executed instruction, with its stores, in the same format as run."""
+
+    def __init__(self, error_file, every: int):
+        super().__init__(error_file)
+        self.legacy_file = NULL_FILE
+        self.every = every
+        self.count = 0
+        self.sampled = False
+
+    def instruction(self, pc: int, record):
+        self.sampled = self.count % self.every == 0
+        self.count += 1
+        if self.sampled:
+            super().instruction(pc, record)
+
+    def store(self, address: int, value):
+        if self.sampled:
+            super().store(address, value)
+
+
+class RingBufferTracer(Tracer):
+    """Keeps the last size events in memory and prints them, in the format of run, only if execution fails."""
+
+    def __init__(self, error_file, size: int):
+        self.error_file = error_file
+        self.events = collections.deque(maxlen=size)
+
+    def instruction(self, pc: int, record):
+        self.events.append((pc, record[1]))
+
+    def store(self, address: int, value):
+        self.events.append((None, address, value))
+
+    def failed(self):
+        print(f'--->  last {len(self.events)} trace events', file=self.error_file)
+        for event in self.events:
+            if event[0] is None:
+                print(f'--->  memory[{event[1]}] =', event[2], file=self.error_file)
+            else:
+                print('--->  PC =', event[0], 'command :', event[1], end='', file=self.error_file)
+
+
+class BinaryTracer(Tracer):
+    """
+    Writes every instruction and store to a binary file: the header BINARY_TRACE_MAGIC followed by
+    BINARY_TRACE_RECORD records (kind, pc or address, opcode or value as unsigned 64 bits).
+    """
+
+    def __init__(self, trace_file, buffer_size: int = 1 << 16):
+        self.trace_file = trace_file
+        self.buffer = bytearray(BINARY_TRACE_MAGIC)
+        self.buffer_size = buffer_size
+
+    def instruction(self, pc: int, record):
+        self.buffer += BINARY_TRACE_RECORD.pack(TRACE_INSTRUCTION, pc, record[0])
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def store(self, address: int, value):
+        self.buffer += BINARY_TRACE_RECORD.pack(TRACE_STORE, address, int(value) & 0xFFFFFFFFFFFFFFFF)
+
+    def flush(self):
+        self.trace_file.write(self.buffer)
+        self.buffer.clear()
+
+    def finish(self):
+        self.flush()
+
+
+class ProfileTracer(Tracer):
+    """
+    Counts executions per pc and control transfers between pcs, to report hot instructions, JPF outcomes, loops
+    and the opcode mix. A JPF whose target is the next instruction is always counted as not taken.
+    """
+
+    def __init__(self):
+        self.counts = collections.defaultdict(int)
+        self.transfers = collections.defaultdict(int)
+        self.last_pc = -1
+
+    def instruction(self, pc: int, record):
+        self.counts[pc] += 1
+        if pc != self.last_pc + 1:
+            self.transfers[self.last_pc, pc] += 1
+        self.last_pc = pc
+
+    def report(self, program: list):
+        """Returns the profile of a run of the decoded program as a JSON serializable dict."""
+        def index(pc):
+            return pc + len(program) if pc < 0 else pc
+
+        counts = len(program) * [0]
+        for pc, count in self.counts.items():
+            counts[index(pc)] += count
+        taken = len(program) * [0]
+        loops = []
+        for (source, target), count in self.transfers.items():
+            source, target = index(source), index(target)
+            taken[source] += count
+            if target <= source:
+                loops.append({'header': target, 'latch': source, 'iterations': count,
+                              'executed': sum(counts[target:source + 1])})
+        loops.sort(key=lambda loop: loop['executed'], reverse=True)
+        opcodes = collections.Counter()
+        for record, count in zip(program, counts):
+            opcodes[OPCODE_NAMES[record[0]]] += count
+        total = sum(counts)
+        return {
+            'executed': total,
+            'instructions': [{'pc': pc, 'instruction': record[1].strip(), 'count': count,
+                              'share': count / total if total else 0.0}
+                             for pc, (record, count) in enumerate(zip(program, counts))],
+            'branches': [{'pc': pc, 'taken': taken[pc], 'not_taken': counts[pc] - taken[pc]}
+                         for pc, record in enumerate(program) if record[0] == OP_JPF and counts[pc]],
+            'loops': loops,
+            'opcodes': dict(opcodes.most_common()),
+        }
+
+    @staticmethod
+    def write_listing(report: dict, listing_file):
+        """Writes the program annotated with the execution count and share of each instruction."""
+        branches = {branch['pc']: branch for branch in report['branches']}
+        headers = {loop['header']: loop for loop in report['loops']}
+        for entry in report['instructions']:
+            notes = []
+            if entry['pc'] in headers:
+                loop = headers[entry['pc']]
+                notes.append(f'loop to {loop["latch"]}: {loop["iterations"]} iterations, {loop["executed"]} executed')
+            if entry['pc'] in branches:
+                branch = branches[entry['pc']]
+                notes.append(f'taken {branch["taken"]}, not taken {branch["not_taken"]}')
+            print(f'{entry["count"]:>12} {100 * entry["share"]:6.2f}%  {entry["instruction"]}',
+                  *(f'  ; {note}' for note in notes), sep='', file=listing_file)
+        print(f'{report["executed"]:>12} executed', file=listing_file)
+        for name, count in report['opcodes'].items():
+            print(f'{count:>12} {name}', file=listing_file)
+
+
+BINARY_TRACE_MAGIC = b'CMVT\x01'
+BINARY_TRACE_RECORD = struct.Struct('<BiQ')
+TRACE_INSTRUCTION, TRACE_STORE = range(2)
+
+
+def read_binary_trace(trace_file):
+    """Yields the (kind, pc or address, opcode or value) records of a binary trace."""
+    if trace_file.read(len(BINARY_TRACE_MAGIC)) != BINARY_TRACE_MAGIC:
+        raise ValueError('Not a binary VM trace')
+    yield from BINARY_TRACE_RECORD.iter_unpack(trace_file.read())
+
+
+FULL_TRACE = object()
+
+
+def run_decoded(instructions: list[str], output_file, error_file, tracer=FULL_TRACE):
+    """
+    Same as run, but decodes the program once and executes the records through a dispatch table.
+    By default the trace matches run; pass a Tracer to trace differently, or None to not trace at all.
+    """
+    if tracer is FULL_TRACE:
+        tracer = FullTracer(error_file)
+    context = Context(output_file, tracer.legacy_file if tracer is not None else NULL_FILE, Memory())
+    program = decode(instructions)
+    traces_stores = tracer is not None and type(tracer).store is not Tracer.store
+    handlers = make_handlers(tracer.store if traces_stores else None)
+    try:
+        if tracer is None:
+            while context.pc < len(program):
+                record = program[context.pc]
+                opcode = record[0]
+                if opcode == OP_LEGACY:
+                    __execute(record[1], context)
+                    continue
+                context.pc += 1
+                handlers[opcode](record, context)
+        else:
+            trace_legacy = tracer.legacy_file is NULL_FILE
+            while context.pc < len(program):
+                record = program[context.pc]
+                opcode = record[0]
+                if opcode == OP_LEGACY:
+                    if trace_legacy:
+                        tracer.instruction(context.pc, record)
+                    __execute(record[1], context)
+                    continue
+                tracer.instruction(context.pc, record)
+                context.pc += 1
+                handlers[opcode](record, context)
+    except:
+        print(context.memory, file=sys.stderr)
+        if tracer is not None:
+            tracer.failed()
+        raise
+    finally:
+        if tracer is not None:
+            tracer.finish()
+
+
+OPERATORS = {OP_ADD: '{0} + {1}', OP_AND: '{0} & {1}', OP_EQ: 'int({0} == {1})', OP_LT: 'int({0} < {1})',
+             OP_MULT: '{0} * {1}', OP_DIV: '{0} // {1}', OP_SUB: '{0} - {1}'}
+
+
+def legacy_block(instruction: str, pc: int, context: Context):
+    """Returns a block executing one OP_LEGACY instruction through the reference interpreter."""
+    def block():
+        context.pc = pc
+        __execute(instruction, context)
+        return context.pc
+
+    return block
+
+
+class BlockCompiler:
+    """
+    Compiles the decoded program, one basic block at a time, into Python functions that access the memory cells
+    directly and return the pc of the next block. Blocks start at the pc execution reaches them with, so
+    computed jumps into the middle of a block just compile another block, and end at a jump, before a static
+    jump target or before an OP_LEGACY instruction, which runs through the reference interpreter.
+    """
+
+    def __init__(self, program: list, context: Context):
+        self.program = program
+        self.context = context
+        self.memory = context.memory
+        self.blocks = {}
+        self.leaders = set()
+        highest = -1
+        for pc, record in enumerate(program):
+            opcode = record[0]
+            if opcode in (OP_JP, OP_JPF):
+                mode, target = record[2 + DEST_OPERANDS[opcode] * 2: 4 + DEST_OPERANDS[opcode] * 2]
+                if mode != INDIRECT:
+                    self.leaders.add(target)
+                self.leaders.add(pc + 1)
+                continue
+            if opcode == OP_LEGACY:
+                self.leaders.add(pc + 1)
+                continue
+            for operand in range(OPERAND_COUNTS[opcode]):
+                mode, value = record[2 + 2 * operand: 4 + 2 * operand]
+                if mode != IMMEDIATE or operand == DEST_OPERANDS[opcode]:
+                    highest = max(highest, value)
+        # cells the program names directly are compiled to list accesses, so they have to exist up front
+        self.memory.reserve(min(highest + 1, self.memory.dense_limit))
+
+    def get_block(self, pc: int):
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.blocks[pc] = self.compile_block(pc)
+        return block
+
+    def compile_block(self, start: int):
+        if self.program[start][0] == OP_LEGACY:
+            return legacy_block(self.program[start][1], start, self.context)
+        lines = []
+        pc = start
+        jumped = False
+        while pc < len(self.program):
+            record = self.program[pc]
+            opcode = record[0]
+            if opcode == OP_LEGACY or (pc != start and pc in self.leaders):
+                break
+            pc += 1
+            if opcode == OP_JP:
+                lines.append(f'return {self.dest(lines, record[2], record[3], "")}')
+                jumped = True
+                break
+            if opcode == OP_JPF:
+                self.read(lines, record[2], record[3], 'x0')
+                lines.append('if not x0:')
+                lines.append(f'    return {self.dest(lines, record[4], record[5], "    ")}')
+                lines.append(f'return {pc}')
+                jumped = True
+                break
+            if opcode == OP_PRINT:
+                self.read(lines, record[2], record[3], 'x0')
+                lines.append("print('PRINT', x0, sep='    ', file=out)")
+            elif opcode == OP_ASSIGN:
+                address = self.dest(lines, record[4], record[5], '')
+                if self.is_dense(record[4], record[5]):
+                    lines.append(f'if c[{address}] is None: o.append({address}); c[{address}] = 0')
+                    self.read(lines, record[2], record[3], 'x0')
+                    lines.append(f'c[{address}] = x0')
+                else:
+                    lines.append(f'if {address} not in m: m.write({address}, 0)')
+                    self.read(lines, record[2], record[3], 'x0')
+                    lines.append(f'm.write({address}, x0)')
+            elif opcode == OP_NOT:
+                self.read(lines, record[2], record[3], 'x0')
+                self.store(lines, record[4], record[5], 'not x0')
+            else:
+                self.read(lines, record[2], record[3], 'x0')
+                self.read(lines, record[4], record[5], 'x1')
+                self.store(lines, record[6], record[7], OPERATORS[opcode].format('x0', 'x1'))
+        if not jumped:
+            lines.append(f'return {pc}')
+        source = 'def block(c=c, o=o, m=m, out=out):\n' + ''.join(f'    {line}\n' for line in lines)
+        namespace = {'c': self.memory.cells, 'o': self.memory.order, 'm': self.memory,
+                     'out': self.context.output_file}
+        exec(compile(source, f'<block {start}>', 'exec'), namespace)
+        return namespace['block']
+
+    def is_dense(self, mode: int, value: int):
+        return mode != INDIRECT and 0 <= value < len(self.memory.cells)
+
+    def read(self, lines: list, mode: int, value: int, name: str, indent: str = ''):
+        """Emits the code fetching an operand in the given addressing mode into the variable name."""
+        if mode == IMMEDIATE:
+            lines.append(f'{indent}{name} = {value}')
+        elif mode == INDIRECT:
+            self.read(lines, DIRECT, value, name, indent)
+            lines.append(f'{indent}{name} = m.read({name})')
+        elif 0 <= value < len(self.memory.cells):
+            lines.append(f'{indent}{name} = c[{value}]')
+            lines.append(f"{indent}if {name} is None: raise Exception('Invalid access to memory', {value})")
+        else:
+            lines.append(f'{indent}{name} = m.read({value})')
+
+    def dest(self, lines: list, mode: int, value: int, indent: str):
+        """Emits the code resolving a destination operand and returns the expression holding its address."""
+        if mode != INDIRECT:
+            return str(value)
+        self.read(lines, DIRECT, value, 'd', indent)
+        return 'd'
+
+    def store(self, lines: list, mode: int, value: int, result: str):
+        address = self.dest(lines, mode, value, '')
+        if self.is_dense(mode, value):
+            lines.append(f'x0 = {result}')
+            lines.append(f'if c[{address}] is None: o.append({address})')
+            lines.append(f'c[{address}] = x0')
+        else:
+            lines.append(f'm.write({address}, {result})')
+
+
+def run_compiled(instructions: list[str], output_file, error_file):
+    """
+    Same as run without tracing, but executes the program as basic blocks compiled to Python functions.
+    Use compare_engines to check it against the reference interpreter.
+    """
+    context = Context(output_file, NULL_FILE, Memory())
+    compiler = BlockCompiler(decode(instructions), context)
+    length = len(compiler.program)
+    blocks = compiler.blocks
+    pc = 0
+    try:
+        while pc < length:
+            block = blocks.get(pc)
+            if block is None:
+                block = compiler.get_block(pc)
+            pc = block()
+    except:
+        print(context.memory, file=sys.stderr)
+        raise
+
+
+def capture_run(engine, instructions: list[str]):
+    """Runs instructions on engine and returns (PRINT output, exception or None, memory dump on failure)."""
+    output_file, error_file, dump_file = io.StringIO(), NULL_FILE, io.StringIO()
+    error = None
+    with contextlib.redirect_stderr(dump_file):
+        try:
+            engine(instructions, output_file, error_file)
+        except Exception as e:
+            error = (type(e).__name__, e.args)
+    return output_file.getvalue(), error, dump_file.getvalue()
+
+
+def compare_engines(instructions: list[str], engine=None, reference=None):
+    """
+    Differential test: runs the program on both engines and returns a list of the divergences found in their
+    PRINT output, exceptions and memory dumps; an empty list means they agree.
+    """
+    engine = engine or run_compiled
+    reference = reference or run
+    divergences = []
+    for name, expected, actual in zip(['output', 'error', 'memory dump'],
+                                      capture_run(reference, instructions), capture_run(engine, instructions)):
+        if expected != actual:
+            divergences.append(f'{name} differs: expected {expected!r}, got {actual!r}')
+    return divergences
+
+
+ENGINES = {'decoded': run_decoded, 'compiled': run_compiled, 'reference': run}
+TRACE_LEVELS = ['full', 'off', 'jumps', 'sampled', 'ring', 'binary', 'profile']
+
+
+def make_tracer(level: str, error_file, every: int = 1000, size: int = 1000, trace_file=None):
+    if level == 'off':
+        return None
+    elif level == 'jumps':
+        return JumpTracer(error_file)
+    elif level == 'sampled':
+        return SampledTracer(error_file, every)
+    elif level == 'ring':
+        return RingBufferTracer(error_file, size)
+    elif level == 'binary':
+        return BinaryTracer(trace_file)
+    elif level == 'profile':
+        return ProfileTracer()
+    return FullTracer(error_file)
+
+
 if __name__ == "__main__":
-    program = open(sys.argv[1], "r")
-    run(program.readlines(), sys.stdout, sys.stderr)
+    arg_parser = argparse.ArgumentParser(description='Runs the intermediate code in a compiler output file.')
+    arg_parser.add_argument('program', help='path to the output file')
+    arg_parser.add_argument('--engine', choices=ENGINES, default='decoded')
+    arg_parser.add_argument('--trace', choices=TRACE_LEVELS, default='full',
+                            help='trace level of the decoded engine (the reference engine always traces fully, '
+                                 'the compiled engine never traces)')
+    arg_parser.add_argument('--trace-every', type=int, default=1000, help='sampling period of --trace sampled')
+    arg_parser.add_argument('--trace-size', type=int, default=1000, help='events kept by --trace ring')
+    arg_parser.add_argument('--trace-file', default='trace.bin', help='output file of --trace binary')
+    arg_parser.add_argument('--profile-file', default='profile.json', help='JSON report of --trace profile')
+    arg_parser.add_argument('--profile-listing', default='profile.txt',
+                            help='annotated program listing of --trace profile')
+    arg_parser.add_argument('--differential', action='store_true',
+                            help='run the program on --engine and on the reference engine and report any divergence')
+    args = arg_parser.parse_args()
+    program = open(args.program, "r")
+    if args.differential:
+        divergences = compare_engines(program.readlines(), ENGINES[args.engine])
+        for divergence in divergences:
+            print(divergence, file=sys.stderr)
+        sys.exit(1 if divergences else 0)
+    elif args.engine == 'compiled':
+        run_compiled(program.readlines(), sys.stdout, sys.stderr)
+    elif args.engine == 'reference':
+        run(program.readlines(), sys.stdout, sys.stderr)
+    elif args.trace == 'profile':
+        instructions = program.readlines()
+        profiler = ProfileTracer()
+        try:
+            run_decoded(instructions, sys.stdout, sys.stderr, profiler)
+        finally:
+            report = profiler.report(decode(instructions))
+            with open(args.profile_file, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+            with open(args.profile_listing, 'w') as listing_file:
+                ProfileTracer.write_listing(report, listing_file)
+    elif args.trace == 'binary':
+        with open(args.trace_file, 'wb') as trace_file:
+            run_decoded(program.readlines(), sys.stdout, sys.stderr, make_tracer('binary', sys.stderr,
+                                                                                 trace_file=trace_file))
+    else:
+        run_decoded(program.readlines(), sys.stdout, sys.stderr,
+                    make_tracer(args.trace, sys.stderr, args.trace_every, args.trace_size))
@@ -0,0 +1,109 @@
+from array import array
+
+NO_NODE = -1
+WRITE_BUFFER_LINES = 4096
+
+
+class ParseTree:
+    """
+    Parse tree stored as parallel arrays indexed by node number; node 0 is the root.
+    Nodes are created detached and attached as the last child of their parent in O(1). Labels that are not
+    strings are rendered with label_text.
+    """
+
+    def __init__(self, root_label, label_text=str):
+        self.label_text = label_text
+        self.labels = []
+        self.first_child = array('i')
+        self.last_child = array('i')
+        self.next_sibling = array('i')
+        self.root = self.add(root_label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, label, parent=NO_NODE):
+        node = len(self.labels)
+        self.labels.append(label)
+        self.first_child.append(NO_NODE)
+        self.last_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        if parent != NO_NODE:
+            self.attach(node, parent)
+        return node
+
+    def attach(self, node, parent):
+        last = self.last_child[parent]
+        if last == NO_NODE:
+            self.first_child[parent] = node
+        else:
+            self.next_sibling[last] = node
+        self.last_child[parent] = node
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def text(self, node):
+        label = self.labels[node]
+        return label if type(label) is str else self.label_text(label)
+
+    def render_lines(self):
+        """Yields the lines of the tree in anytree's RenderTree box-drawing format, without recursion."""
+        labels = self.labels
+        label_text = self.label_text
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        yield self.text(self.root)
+        stack = []
+        if first_child[self.root] != NO_NODE:
+            stack.append((first_child[self.root], ''))
+        while stack:
+            node, indent = stack.pop()
+            label = labels[node]
+            if type(label) is not str:
+                label = label_text(label)
+            sibling = next_sibling[node]
+            if sibling != NO_NODE:
+                stack.append((sibling, indent))
+                yield indent + '├── ' + label
+                child_indent = indent + '│   '
+            else:
+                yield indent + '└── ' + label
+                child_indent = indent + '    '
+            if first_child[node] != NO_NODE:
+                stack.append((first_child[node], child_indent))
+
+    def write(self, f):
+        """Writes the rendered tree to f incrementally; the output equals RenderTree(root).by_attr('id')."""
+        lines = self.render_lines()
+        f.write(next(lines))
+        buffer = []
+        for line in lines:
+            buffer.append(line)
+            if len(buffer) == WRITE_BUFFER_LINES:
+                f.write('\n' + '\n'.join(buffer))
+                buffer.clear()
+        if buffer:
+            f.write('\n' + '\n'.join(buffer))
+
+    def render(self):
+        return '\n'.join(self.render_lines())
+
+    def to_anytree(self):
+        """Converts the tree to anytree AnyNodes with an id attribute; needs the optional anytree package."""
+        from anytree import AnyNode
+        order = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(reversed(list(self.children(node))))
+        nodes = {node: AnyNode(id=self.text(node)) for node in order}
+        # children are attached before their parent is, so anytree's loop check stays O(1)
+        for node in reversed(order):
+            if self.first_child[node] != NO_NODE:
+                nodes[node].children = [nodes[child] for child in self.children(node)]
+        return nodes[self.root]
@@ -0,0 +1,235 @@
+"""
+Runs compiled programs in the VM in parallel and checks them against the expected outputs of their test cases.
+> python3 compiler.py inputs -o output
+> python3 vm_runner.py output --expected testcases/phase-3
+A case is a directory of --expected (by default the output root) holding expected.txt, the PRINT output the program
+should produce, and/or semantic_errors.txt, the semantic errors the compiler should report. The compiler outputs of
+a case are in the directory at the same relative path below the output root, or in its input directory, where
+compiler.py writes the outputs of <case>/input.txt. With --differential every program also runs on a second engine,
+and any divergence between the engines fails the case.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import test_vm
+
+EXPECTED_FILES = ('expected.txt', 'semantic_errors.txt')
+DEFAULT_BUDGET = 10_000_000
+DEFAULT_TIMEOUT = 10.0
+
+CaseResult = namedtuple('CaseResult', 'name passed failures instructions seconds')
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Timeout(BaseException):
+    """Raised by the timer in the middle of a run; not an Exception, so the engines' error capture passes it on."""
+
+
+class BudgetTracer(test_vm.Tracer):
+    """Counts the instructions run_decoded executes and stops the program once it exceeds the budget."""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.executed = 0
+
+    def instruction(self, pc, record):
+        self.executed += 1
+        if self.budget is not None and self.executed > self.budget:
+            raise BudgetExceeded(f'exceeded the budget of {self.budget} instructions')
+
+
+def find_output_dir(output_root, name):
+    output_dir = os.path.normpath(os.path.join(output_root, name))
+    input_dir = os.path.join(output_dir, 'input')
+    if not os.path.exists(os.path.join(output_dir, 'output.txt')) and os.path.isdir(input_dir):
+        return input_dir
+    return output_dir
+
+
+def find_cases(output_root, expected_root=None):
+    """Returns (name, output directory, expected directory) for each case directory below expected_root."""
+    expected_root = expected_root or output_root
+    cases = []
+    for directory, _, names in os.walk(expected_root):
+        if any(name in names for name in EXPECTED_FILES):
+            name = os.path.relpath(directory, expected_root)
+            cases.append((name, find_output_dir(output_root, name), directory))
+    return sorted(cases)
+
+
+def normalized_lines(text):
+    """The non-empty lines of text with runs of whitespace made single spaces, so tabs and spaces compare equal."""
+    return [' '.join(line.split()) for line in text.splitlines() if line.strip()]
+
+
+def read_text(path):
+    with open(path) as f:
+        return f.read()
+
+
+def first_difference(expected, actual):
+    for line_number, (expected_line, actual_line) in enumerate(zip(expected, actual), 1):
+        if expected_line != actual_line:
+            return f'line {line_number}: expected {expected_line!r}, got {actual_line!r}'
+    if len(expected) > len(actual):
+        return f'missing line {len(actual) + 1}: {expected[len(actual)]!r}'
+    return f'unexpected line {len(expected) + 1}: {actual[len(expected)]!r}'
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    def expire(signum, frame):
+        raise Timeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def run_program(instructions, engine, budget):
+    """
+    Runs the program on engine and returns (PRINT output, exception or None, memory dump, instructions executed).
+    Only the decoded engine counts instructions and stops at the budget; the count is None on the others.
+    """
+    output_file = io.StringIO()
+    dump_file = io.StringIO()
+    tracer = BudgetTracer(budget) if engine == 'decoded' else None
+    error = None
+    # the engines dump the memory to stderr when the program fails
+    with contextlib.redirect_stderr(dump_file):
+        try:
+            if tracer is not None:
+                test_vm.run_decoded(instructions, output_file, test_vm.NULL_FILE, tracer)
+            else:
+                test_vm.ENGINES[engine](instructions, output_file, test_vm.NULL_FILE)
+        except Exception as e:
+            error = e
+    return output_file.getvalue(), error, dump_file.getvalue(), tracer.executed if tracer is not None else None
+
+
+def describe_error(error):
+    if isinstance(error, BudgetExceeded):
+        return str(error)
+    return f'raised {type(error).__name__}: {error}'
+
+
+def error_key(error):
+    # the same form test_vm.capture_run compares exceptions in
+    return None if error is None else (type(error).__name__, error.args)
+
+
+def run_case(job):
+    """
+    Checks one case: its semantic errors, then its program's PRINT output and, in differential mode, the agreement
+    of the two engines. Only the decoded engine counts instructions and enforces the budget; the timeout applies to
+    every engine. The second engine of differential mode is compared with the first engine's run, and does not run
+    when that run exceeded the budget.
+    """
+    name, output_dir, expected_dir, engine, differential, budget, timeout = job
+    start = time.perf_counter()
+    failures = []
+    instructions_executed = None
+    expected_errors_path = os.path.join(expected_dir, 'semantic_errors.txt')
+    expected_output_path = os.path.join(expected_dir, 'expected.txt')
+    try:
+        if os.path.exists(expected_errors_path):
+            expected = normalized_lines(read_text(expected_errors_path))
+            actual = normalized_lines(read_text(os.path.join(output_dir, 'semantic_errors.txt')))
+            if expected != actual:
+                failures.append('semantic errors differ, ' + first_difference(expected, actual))
+        if os.path.exists(expected_output_path):
+            with open(os.path.join(output_dir, 'output.txt')) as f:
+                instructions = f.readlines()
+            try:
+                with time_limit(timeout):
+                    output, error, dump, instructions_executed = run_program(instructions, engine, budget)
+                    if error is not None:
+                        failures.append(describe_error(error))
+                    expected = normalized_lines(read_text(expected_output_path))
+                    actual = normalized_lines(output)
+                    if expected != actual:
+                        failures.append('output differs, ' + first_difference(expected, actual))
+                    if differential and not isinstance(error, BudgetExceeded):
+                        other_output, other_error, other_dump, _ = run_program(instructions, differential, budget)
+                        for part, first, second in zip(['output', 'error', 'memory dump'],
+                                                       [output, error_key(error), dump],
+                                                       [other_output, error_key(other_error), other_dump]):
+                            if first != second:
+                                failures.append(f'{engine} and {differential} diverge: {part} differs, '
+                                                f'{engine} gave {first!r}, {differential} gave {second!r}')
+            except Timeout:
+                failures.append(f'timed out after {timeout} s')
+    except OSError as e:
+        failures.append(f'{type(e).__name__}: {e}')
+    return CaseResult(name, not failures, failures, instructions_executed, time.perf_counter() - start)
+
+
+def run_cases(cases, engine='decoded', differential=None, budget=DEFAULT_BUDGET, timeout=DEFAULT_TIMEOUT,
+              workers=None):
+    jobs = [(name, output_dir, expected_dir, engine, differential, budget, timeout)
+            for name, output_dir, expected_dir in cases]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return list(executor.map(run_case, jobs))
+
+
+def print_results(results, wall_time):
+    for result in results:
+        executed = f'\t{result.instructions} instructions' if result.instructions is not None else ''
+        print(f'{result.name}\t{"PASS" if result.passed else "FAIL"}{executed}\t{result.seconds * 1000:.1f} ms')
+        for failure in result.failures:
+            print(f'\t{failure}')
+    passed = sum(1 for result in results if result.passed)
+    print(f'{len(results)} cases, {passed} passed, {len(results) - passed} failed, '
+          f'{sum(result.instructions or 0 for result in results)} instructions, {wall_time:.2f} s wall, '
+          f'{sum(result.seconds for result in results):.2f} s running')
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Runs compiled programs in parallel against expected outputs.')
+    arg_parser.add_argument('output_root', help='root of the compiler output directories')
+    arg_parser.add_argument('--expected', help='root of the case directories (default: the output root)')
+    arg_parser.add_argument('--engine', choices=test_vm.ENGINES, default='decoded')
+    arg_parser.add_argument('--differential', choices=test_vm.ENGINES,
+                            help='also run every program on this engine and fail the cases where the engines diverge')
+    arg_parser.add_argument('--budget', type=int,
+                            help=f'instructions a program may execute on the decoded engine, the only one that counts '
+                                 f'them (default: {DEFAULT_BUDGET}, 0: no limit)')
+    arg_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds a case may run')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    arg_parser.add_argument('--json', metavar='PATH', help='also write the results as JSON to PATH')
+    args = arg_parser.parse_args(argv)
+    if args.budget is not None and 'decoded' not in (args.engine, args.differential):
+        arg_parser.error('--budget only applies to the decoded engine')
+    budget = DEFAULT_BUDGET if args.budget is None else args.budget or None
+
+    cases = find_cases(args.output_root, args.expected)
+    if not cases:
+        print('No test cases found.', file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    results = run_cases(cases, args.engine, args.differential, budget, args.timeout, args.jobs)
+    wall_time = time.perf_counter() - start
+    print_results(results, wall_time)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': [result._asdict() for result in results], 'wall': wall_time}, f, indent=2)
+    return 0 if all(result.passed for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())